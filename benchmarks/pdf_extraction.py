@@ -0,0 +1,107 @@
+"""
+Benchmark serial vs parallel PDF text extraction.
+
+Run from the repository root:
+
+    python -m benchmarks.pdf_extraction [path/to/file.pdf] [--workers 4]
+
+Without a path, a synthetic text-heavy PDF of --pages pages is
+generated in a temp folder. Reports pages/sec for the serial
+extract_pdf_text path and for extract_pdf_text_parallel.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import fitz
+
+from planora_app.ai import pdf_utils
+
+
+SAMPLE_PARAGRAPH = (
+    "Photosynthesis converts light energy into chemical energy stored "
+    "in glucose. The light-dependent reactions take place in the "
+    "thylakoid membranes, while the Calvin cycle runs in the stroma. "
+)
+
+
+def build_sample_pdf(path, pages):
+
+    document = fitz.open()
+
+    for page_number in range(pages):
+
+        page = document.new_page()
+
+        page.insert_textbox(
+            page.rect + (36, 36, -36, -36),
+            f"Page {page_number + 1}\n\n" + SAMPLE_PARAGRAPH * 20,
+            fontsize=9
+        )
+
+    document.save(path)
+    document.close()
+
+
+def best_time(function, repeat):
+
+    timings = []
+
+    for _ in range(repeat):
+
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+
+    return min(timings)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pdf", nargs="?")
+    parser.add_argument("--pages", type=int, default=pdf_utils.MAX_PAGES)
+    parser.add_argument("--workers", type=int, default=pdf_utils.PARALLEL_EXTRACT_WORKERS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pdf_utils.PARALLEL_EXTRACT_WORKERS = args.workers
+
+    with tempfile.TemporaryDirectory() as folder:
+
+        pdf_path = args.pdf
+
+        if pdf_path is None:
+            pdf_path = os.path.join(folder, "sample.pdf")
+            build_sample_pdf(pdf_path, args.pages)
+
+        page_count = pdf_utils.pdf_page_count(pdf_path)
+
+        serial_text, _ = pdf_utils.extract_pdf_text(pdf_path, parallel=False)
+
+        # Start the pool outside the timed runs; a server pays this once.
+        parallel_text = pdf_utils.extract_pdf_text_parallel(pdf_path, page_count)
+
+        if parallel_text != serial_text:
+            raise SystemExit("Parallel extraction does not match serial output.")
+
+        serial = best_time(
+            lambda: pdf_utils.extract_pdf_text(pdf_path, parallel=False),
+            args.repeat
+        )
+
+        parallel = best_time(
+            lambda: pdf_utils.extract_pdf_text_parallel(pdf_path, page_count),
+            args.repeat
+        )
+
+    print(f"pages: {page_count}, workers: {args.workers}, cpus: {os.cpu_count()}")
+    print(f"serial:   {page_count / serial:8.1f} pages/sec ({serial * 1000:.0f} ms)")
+    print(f"parallel: {page_count / parallel:8.1f} pages/sec ({parallel * 1000:.0f} ms)")
+    print(f"speedup:  {serial / parallel:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
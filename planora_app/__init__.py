@@ -64,5 +64,21 @@ def create_app():
     
     from planora_app.mindmap.routes import mindmap_bp
     app.register_blueprint(mindmap_bp)
+
+    from planora_app.studypack.routes import studypack_bp
+    app.register_blueprint(studypack_bp)
+
+    from planora_app.jobs.routes import jobs_bp
+    app.register_blueprint(jobs_bp)
+
+    # Blueprints import the service modules that register indexes.
+    from planora_app.indexes import init_indexes
+    init_indexes(app)
+
+    from planora_app.pomodoro.rollup_services import rollups_cli
+    app.cli.add_command(rollups_cli)
+
+    from planora_app.pomodoro.streak_services import streaks_cli
+    app.cli.add_command(streaks_cli)
     
     return app
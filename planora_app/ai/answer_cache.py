@@ -0,0 +1,251 @@
+"""
+Semantic answer cache for chat questions over the same documents.
+
+Handles:
+- scopes keyed by the content hashes of a conversation's documents
+- local question vectors and a cosine similarity threshold
+- skipping short follow-ups that only make sense in context
+- skipping refusals and "not in the document" answers
+- LRU and age eviction per scope
+- invalidation when a document blob is removed
+- hit / miss counters
+
+Entries live in the Mongo "answer_cache" collection, so a class asking
+the same question about the same textbook shares answers across
+conversations and gunicorn workers. Callers only cache a
+conversation's opening question: its answer depends on the documents
+and the question alone, never on one student's history.
+"""
+
+import hashlib
+import os
+import re
+from datetime import datetime, timedelta, UTC
+
+import numpy as np
+
+from planora_app.extensions import get_db
+from planora_app.ai.embeddings import embed_question
+from planora_app.ai.utils import tokenize
+from planora_app.metrics import Metrics
+from planora_app.ai.gemini import NO_RESPONSE_TEXT
+from planora_app.ai.intents import OFF_TOPIC_REPLY
+from planora_app.indexes import register_index
+
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "on") != "off"
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.9))
+
+ANSWER_CACHE_MAX_AGE = timedelta(
+    seconds=int(os.getenv("ANSWER_CACHE_MAX_AGE_SECONDS", 7 * 24 * 60 * 60))
+)
+
+# Entries kept per document set; the least recently used go first.
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 200))
+
+# Follow-ups like "explain more" depend on the conversation, not the
+# documents, so questions with fewer content words are never cached.
+ANSWER_CACHE_MIN_TERMS = 3
+
+# Answers that say the material does not cover the question; a later
+# upload or rephrasing may do better, so they are not replayed.
+NOT_COVERED_PATTERN = re.compile(
+    r"\b(not|n't) (mentioned|covered|found|included|present|provided|available|discussed)"
+    r"|\b(does not|doesn't|do not|don't) (contain|mention|cover|include|discuss)"
+    r"|\bno (information|mention|details?) (about|on|of|regarding)",
+    re.IGNORECASE
+)
+
+register_index("answer_cache", [("scope", 1), ("created_at", -1)])
+register_index("answer_cache", [("scope", 1), ("last_used", -1)])
+register_index("answer_cache", [("content_hashes", 1)])
+
+
+def answer_scope(content_hashes):
+    """
+    Cache scope for a set of documents, or None when there is none.
+    A changed document has a new content hash and so a new scope.
+    """
+
+    hashes = sorted(set(content_hashes))
+
+    if not hashes:
+        return None
+
+    return hashlib.sha256("|".join(hashes).encode("utf-8")).hexdigest()
+
+
+def is_cacheable_answer(answer):
+    """
+    False for failures, refusals and answers saying the documents do
+    not cover the question.
+    """
+
+    answer = (answer or "").strip()
+
+    if not answer or answer == NO_RESPONSE_TEXT:
+        return False
+
+    if OFF_TOPIC_REPLY.lower() in answer.lower():
+        return False
+
+    return NOT_COVERED_PATTERN.search(answer) is None
+
+
+def _question_vector(question):
+
+    if len(tokenize(question)) < ANSWER_CACHE_MIN_TERMS:
+        return None
+
+    return embed_question(question)
+
+
+def _sparse(vector):
+
+    buckets = np.flatnonzero(vector)
+
+    return buckets.tolist(), vector[buckets].tolist()
+
+
+def _dense(buckets, weights, size):
+
+    vector = np.zeros(size, dtype=np.float32)
+    vector[buckets] = weights
+
+    return vector
+
+
+class SemanticAnswerCache:
+
+    def __init__(
+        self,
+        threshold=ANSWER_CACHE_THRESHOLD,
+        max_age=ANSWER_CACHE_MAX_AGE,
+        max_entries=ANSWER_CACHE_MAX_ENTRIES
+    ):
+
+        self.threshold = threshold
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.metrics = Metrics()
+
+    def lookup(self, scope, question):
+        """
+        Return the cached entry most similar to question, or None below
+        the threshold.
+        """
+
+        vector = _question_vector(question)
+
+        if scope is None or vector is None:
+            return None
+
+        db = get_db()
+
+        entries = list(
+            db.answer_cache.find(
+                {
+                    "scope": scope,
+                    "created_at": {"$gt": datetime.now(UTC) - self.max_age}
+                },
+                {"buckets": 1, "weights": 1}
+            )
+        )
+
+        best_entry = None
+        best_score = 0.0
+
+        for entry in entries:
+
+            score = float(
+                vector @ _dense(entry["buckets"], entry["weights"], vector.size)
+            )
+
+            if score > best_score:
+                best_entry, best_score = entry, score
+
+        if best_entry is None or best_score < self.threshold:
+            self.metrics.incr("misses")
+            return None
+
+        self.metrics.incr("hits")
+
+        return db.answer_cache.find_one_and_update(
+            {"_id": best_entry["_id"]},
+            {
+                "$set": {"last_used": datetime.now(UTC)},
+                "$inc": {"hit_count": 1}
+            },
+            projection={"answer": 1, "sources": 1, "question": 1}
+        )
+
+    def store(self, scope, content_hashes, question, answer, sources=()):
+
+        vector = _question_vector(question)
+
+        if scope is None or vector is None or not is_cacheable_answer(answer):
+            return
+
+        db = get_db()
+
+        buckets, weights = _sparse(vector)
+
+        now = datetime.now(UTC)
+
+        db.answer_cache.insert_one({
+            "scope": scope,
+            "content_hashes": sorted(set(content_hashes)),
+            "question": question,
+            "answer": answer,
+            "sources": list(sources),
+            "buckets": buckets,
+            "weights": weights,
+            "hit_count": 0,
+            "created_at": now,
+            "last_used": now
+        })
+
+        self._evict(scope, now)
+
+    def _evict(self, scope, now):
+
+        db = get_db()
+
+        db.answer_cache.delete_many({
+            "scope": scope,
+            "created_at": {"$lte": now - self.max_age}
+        })
+
+        stale = [
+            entry["_id"]
+            for entry in db.answer_cache.find(
+                {"scope": scope},
+                {"_id": 1}
+            )
+            .sort("last_used", -1)
+            .skip(self.max_entries)
+        ]
+
+        if stale:
+            db.answer_cache.delete_many({"_id": {"$in": stale}})
+
+    def invalidate(self, content_hash):
+        """
+        Drop every answer built from a document, e.g. when its blob is
+        deleted.
+        """
+
+        get_db().answer_cache.delete_many({"content_hashes": content_hash})
+
+    def stats(self):
+
+        counts = self.metrics.snapshot()
+
+        return {
+            "hits": counts.get("hits", 0),
+            "misses": counts.get("misses", 0)
+        }
+
+
+answer_cache = SemanticAnswerCache() if ANSWER_CACHE_ENABLED else None
@@ -0,0 +1,260 @@
+"""
+BM25 keyword index for uploaded documents.
+
+Handles:
+- term -> postings inverted index over the retrieval chunks
+- delta-encoded chunk ids and token positions
+- persisting one index per document content hash
+
+Complements the dense vectors in embeddings.py for exact-term questions
+("define Kirchhoff's law"). Chunk positions match the vector index, so
+both rankings can be fused directly.
+"""
+
+import math
+import os
+
+import numpy as np
+
+from planora_app.ai.chunking import retrieval_spans
+from planora_app.ai.utils import load_or_build_index, tokenize
+
+
+K1 = 1.5
+
+B = 0.75
+
+
+class KeywordIndex:
+    """
+    Inverted index stored as flat arrays.
+
+    Postings of term t live in [term_offsets[t], term_offsets[t + 1]).
+    chunk_deltas holds each posting's chunk id as a delta from the
+    previous posting of the same term; frequencies holds the term count
+    in that chunk, which is also how many entries of positions belong to
+    the posting. positions are deltas within a posting.
+    """
+
+    def __init__(
+        self,
+        terms,
+        term_offsets,
+        chunk_deltas,
+        frequencies,
+        positions,
+        chunk_lengths
+    ):
+
+        self.terms = terms
+        self.vocabulary = {
+            term: term_id
+            for term_id, term in enumerate(terms)
+        }
+        self.term_offsets = term_offsets
+        self.chunk_deltas = chunk_deltas
+        self.frequencies = frequencies
+        self.positions = positions
+        self.chunk_lengths = chunk_lengths
+
+        self.average_length = (
+            float(chunk_lengths.mean()) if len(chunk_lengths) else 0.0
+        )
+
+        # Start of each posting's run in positions, for random access.
+        self.position_offsets = np.concatenate((
+            [0],
+            np.cumsum(frequencies, dtype=np.int64)
+        ))
+
+    def __len__(self):
+
+        return len(self.chunk_lengths)
+
+    @classmethod
+    def build(cls, text):
+
+        postings = {}
+        chunk_lengths = []
+
+        for chunk_id, (start, end) in enumerate(retrieval_spans(text)):
+
+            tokens = tokenize(text[start:end])
+            chunk_lengths.append(len(tokens))
+
+            occurrences = {}
+
+            for position, token in enumerate(tokens):
+                occurrences.setdefault(token, []).append(position)
+
+            for token, token_positions in occurrences.items():
+                postings.setdefault(token, []).append(
+                    (chunk_id, token_positions)
+                )
+
+        terms = sorted(postings)
+
+        term_offsets = [0]
+        chunk_deltas = []
+        frequencies = []
+        positions = []
+
+        for term in terms:
+
+            previous_chunk = 0
+
+            for chunk_id, token_positions in postings[term]:
+
+                chunk_deltas.append(chunk_id - previous_chunk)
+                frequencies.append(len(token_positions))
+                previous_chunk = chunk_id
+
+                previous_position = 0
+
+                for position in token_positions:
+                    positions.append(position - previous_position)
+                    previous_position = position
+
+            term_offsets.append(len(chunk_deltas))
+
+        return cls(
+            terms,
+            np.array(term_offsets, dtype=np.uint32),
+            np.array(chunk_deltas, dtype=np.uint32),
+            np.array(frequencies, dtype=np.uint16),
+            np.array(positions, dtype=np.uint16),
+            np.array(chunk_lengths, dtype=np.uint16)
+        )
+
+    def _postings(self, term_id):
+
+        low = self.term_offsets[term_id]
+        high = self.term_offsets[term_id + 1]
+
+        return low, high, np.cumsum(self.chunk_deltas[low:high])
+
+    def term_positions(self, term, chunk_id):
+        """
+        Token positions of a term inside one chunk.
+        """
+
+        term_id = self.vocabulary.get(term)
+
+        if term_id is None:
+            return []
+
+        low, _, chunks = self._postings(term_id)
+
+        matches = np.flatnonzero(chunks == chunk_id)
+
+        if len(matches) == 0:
+            return []
+
+        posting = low + int(matches[0])
+
+        start = self.position_offsets[posting]
+        end = self.position_offsets[posting + 1]
+
+        return np.cumsum(self.positions[start:end]).tolist()
+
+    def scores(self, query):
+
+        scores = np.zeros(len(self), dtype=np.float32)
+
+        if len(self) == 0:
+            return scores
+
+        for term in set(tokenize(query)):
+
+            term_id = self.vocabulary.get(term)
+
+            if term_id is None:
+                continue
+
+            low, high, chunks = self._postings(term_id)
+
+            document_frequency = high - low
+
+            idf = math.log(
+                1.0
+                + (len(self) - document_frequency + 0.5)
+                / (document_frequency + 0.5)
+            )
+
+            frequency = self.frequencies[low:high].astype(np.float32)
+
+            length_norm = K1 * (
+                1.0 - B
+                + B * self.chunk_lengths[chunks] / self.average_length
+            )
+
+            scores[chunks] += (
+                idf * frequency * (K1 + 1.0)
+                / (frequency + length_norm)
+            )
+
+        return scores
+
+    def search(self, query, top_k):
+        """
+        Return [(position, score)] for the best matching chunks,
+        highest score first.
+        """
+
+        scores = self.scores(query)
+
+        matched = np.flatnonzero(scores > 0)
+
+        if len(matched) == 0:
+            return []
+
+        best = matched[np.argsort(-scores[matched])][:top_k]
+
+        return [
+            (int(position), float(scores[position]))
+            for position in best
+        ]
+
+    def save(self, path):
+
+        temp_path = f"{path}.tmp.npz"
+
+        np.savez_compressed(
+            temp_path,
+            terms=np.frombuffer(
+                "\n".join(self.terms).encode("utf-8"),
+                dtype=np.uint8
+            ),
+            term_offsets=self.term_offsets,
+            chunk_deltas=self.chunk_deltas,
+            frequencies=self.frequencies,
+            positions=self.positions,
+            chunk_lengths=self.chunk_lengths
+        )
+
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+
+        with np.load(path) as data:
+
+            terms = data["terms"].tobytes().decode("utf-8")
+
+            return cls(
+                terms.split("\n") if terms else [],
+                data["term_offsets"],
+                data["chunk_deltas"],
+                data["frequencies"],
+                data["positions"],
+                data["chunk_lengths"]
+            )
+
+
+def get_keyword_index(index_path, load_text):
+    """
+    Load the persisted BM25 index for a document, building and saving
+    it from load_text() the first time it is needed.
+    """
+
+    return load_or_build_index(KeywordIndex, index_path, load_text)
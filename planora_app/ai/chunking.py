@@ -1,22 +1,56 @@
 CHUNK_SIZE = 4000
 
+# Rough average for English prose; used for token budgets.
+CHARS_PER_TOKEN = 4
 
-def chunk_text(text):
+# Smaller overlapping chunks for the retrieval indexes. Every index of a
+# document uses the same spans so chunk positions line up across them.
+RETRIEVAL_CHUNK_SIZE = 1200
 
-    chunks = []
+RETRIEVAL_CHUNK_OVERLAP = 200
+
+
+def chunk_spans(text, chunk_size=CHUNK_SIZE, overlap=0):
+
+    spans = []
+
+    step = chunk_size - overlap
 
     start = 0
 
     while start < len(text):
 
-        end = start + CHUNK_SIZE
+        end = start + chunk_size
 
-        chunks.append(
+        spans.append(
 
-            text[start:end]
+            (start, min(end, len(text)))
 
         )
 
-        start = end
+        if end >= len(text):
+            break
+
+        start += step
+
+    return spans
+
+
+def chunk_text(text, chunk_size=CHUNK_SIZE, overlap=0):
+
+    return [
+
+        text[start:end]
+
+        for start, end in chunk_spans(text, chunk_size, overlap)
+
+    ]
+
+
+def retrieval_spans(text):
 
-    return chunks
\ No newline at end of file
+    return chunk_spans(
+        text,
+        RETRIEVAL_CHUNK_SIZE,
+        RETRIEVAL_CHUNK_OVERLAP
+    )
@@ -0,0 +1,282 @@
+"""
+Local retrieval index for uploaded documents.
+
+Handles:
+- hashed TF-IDF vectors (no network, no model download)
+- cosine top-k ranking in one matrix multiply
+- persisting one index per document content hash
+- merging rankings across the documents of a conversation
+
+Chunks are ranked against the user's question so only the relevant
+parts of a long PDF go into the prompt.
+"""
+
+import os
+import zlib
+
+import numpy as np
+
+from planora_app.ai.chunking import retrieval_spans
+from planora_app.ai.utils import (
+    load_or_build_index,
+    reciprocal_rank_fusion,
+    tokenize
+)
+
+
+HASH_DIMENSIONS = 4096
+
+RETRIEVAL_TOP_K = 5
+
+
+def _bucket(token):
+
+    # crc32 is stable across processes, unlike the salted built-in hash().
+    return zlib.crc32(token.encode("utf-8")) % HASH_DIMENSIONS
+
+
+def _term_vector(tokens):
+
+    vector = np.zeros(HASH_DIMENSIONS, dtype=np.float32)
+
+    if not tokens:
+        return vector
+
+    buckets = np.fromiter(
+        (_bucket(token) for token in tokens),
+        dtype=np.int64,
+        count=len(tokens)
+    )
+
+    np.add.at(vector, buckets, 1.0)
+
+    # Sublinear tf so one repeated term does not dominate a chunk.
+    nonzero = vector > 0
+    vector[nonzero] = 1.0 + np.log(vector[nonzero])
+
+    return vector
+
+
+def embed_question(text):
+    """
+    Unit-length hashed vector of a question's words and word pairs.
+
+    Pairs keep "causes of inflation" apart from "inflation causes
+    unemployment"; there is no idf since there is no corpus to take it from.
+    """
+
+    tokens = tokenize(text)
+
+    pairs = [
+        f"{first} {second}"
+        for first, second in zip(tokens, tokens[1:])
+    ]
+
+    return _normalize_rows(_term_vector(tokens + pairs))
+
+
+def _normalize_rows(matrix):
+
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+
+    return matrix / norms
+
+
+class DocumentIndex:
+    """
+    Hashed TF-IDF vectors for the chunks of one document.
+    """
+
+    def __init__(self, text, spans, matrix, idf):
+
+        self.text = text
+        self.spans = spans
+        self.matrix = matrix
+        self.idf = idf
+
+    def __len__(self):
+
+        return len(self.spans)
+
+    def chunk(self, position):
+
+        start, end = self.spans[position]
+
+        return self.text[start:end]
+
+    @classmethod
+    def build(cls, text):
+
+        spans = np.array(
+            retrieval_spans(text),
+            dtype=np.int64
+        ).reshape(-1, 2)
+
+        term_frequencies = np.stack([
+            _term_vector(tokenize(text[start:end]))
+            for start, end in spans
+        ]) if len(spans) else np.zeros((0, HASH_DIMENSIONS), dtype=np.float32)
+
+        document_frequency = np.count_nonzero(term_frequencies, axis=0)
+
+        idf = (
+            np.log((1.0 + len(spans)) / (1.0 + document_frequency))
+            + 1.0
+        ).astype(np.float32)
+
+        matrix = _normalize_rows(term_frequencies * idf).astype(np.float32)
+
+        return cls(text, spans, matrix, idf)
+
+    def query_scores(self, query):
+        """
+        Cosine similarity of the query against every chunk.
+        """
+
+        query_vector = _normalize_rows(
+            _term_vector(tokenize(query)) * self.idf
+        )
+
+        return self.matrix @ query_vector
+
+    def search(self, query, top_k=RETRIEVAL_TOP_K):
+        """
+        Return [(position, score)] for the best matching chunks,
+        highest score first. Chunks with no term overlap are skipped.
+        """
+
+        if len(self) == 0:
+            return []
+
+        scores = self.query_scores(query)
+
+        top_k = min(top_k, len(scores))
+
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        return [
+            (int(position), float(scores[position]))
+            for position in candidates
+            if scores[position] > 0
+        ]
+
+    def save(self, path):
+
+        temp_path = f"{path}.tmp.npz"
+
+        np.savez_compressed(
+            temp_path,
+            text=np.frombuffer(self.text.encode("utf-8"), dtype=np.uint8),
+            spans=self.spans,
+            matrix=self.matrix,
+            idf=self.idf
+        )
+
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+
+        with np.load(path) as data:
+
+            return cls(
+                data["text"].tobytes().decode("utf-8"),
+                data["spans"],
+                data["matrix"],
+                data["idf"]
+            )
+
+
+def get_document_index(index_path, load_text):
+    """
+    Load the persisted vector index for a document, building and saving
+    it from load_text() the first time it is needed.
+    """
+
+    return load_or_build_index(DocumentIndex, index_path, load_text)
+
+
+def retrieve_across_documents(sources, query, top_k=RETRIEVAL_TOP_K, fallback_chunks=3):
+    """
+    Return the top-k chunks over several documents as [(source_id, text)],
+    best first.
+
+    sources is a list of (source_id, index, keyword_index) with
+    keyword_index optional. Dense scores from all documents are merged
+    into one ranking and BM25 scores into another, then the two are
+    combined by reciprocal rank fusion. Falls back to the opening
+    chunks of the first source when nothing matches.
+    """
+
+    candidate_count = top_k * 4
+
+    dense = []
+    keyword = []
+
+    for source_id, index, keyword_index in sources:
+
+        dense.extend(
+            ((source_id, position), score)
+            for position, score in index.search(query, candidate_count)
+        )
+
+        if keyword_index is not None:
+            keyword.extend(
+                ((source_id, position), score)
+                for position, score in keyword_index.search(query, candidate_count)
+            )
+
+    rankings = [
+        sorted(ranking, key=lambda entry: entry[1], reverse=True)[:candidate_count]
+        for ranking in (dense, keyword)
+        if ranking
+    ]
+
+    keys = [
+        key
+        for key, _ in reciprocal_rank_fusion(rankings)[:top_k]
+    ]
+
+    if not keys and sources:
+
+        source_id, index, _ = sources[0]
+
+        keys = [
+            (source_id, position)
+            for position in range(min(fallback_chunks, len(index)))
+        ]
+
+    indexes = {
+        source_id: index
+        for source_id, index, _ in sources
+    }
+
+    return [
+        (source_id, indexes[source_id].chunk(position))
+        for source_id, position in keys
+    ]
+
+
+def retrieve_chunks(
+    index,
+    query,
+    top_k=RETRIEVAL_TOP_K,
+    keyword_index=None,
+    fallback_chunks=3
+):
+    """
+    Return the top-k chunk texts of one document for a query, best
+    first. See retrieve_across_documents.
+    """
+
+    return [
+        text
+        for _, text in retrieve_across_documents(
+            [(None, index, keyword_index)],
+            query,
+            top_k,
+            fallback_chunks
+        )
+    ]
@@ -0,0 +1,117 @@
+"""
+Local stand-in for the Gemini client.
+
+Enabled with GEMINI_BACKEND=fake. Mirrors the parts of
+genai.Client().models that Planora uses, so chat, streaming, flashcards
+and mindmaps can run without network access or an API key.
+
+GEMINI_FAKE_ERROR_RATE makes a share of calls fail with
+GEMINI_FAKE_ERROR_CODE (429 by default), to exercise retries, the
+concurrency limiter and the circuit breaker.
+"""
+
+import os
+import random
+import time
+
+
+FAKE_REPLY = os.getenv("GEMINI_FAKE_REPLY")
+
+FAKE_DELAY = float(os.getenv("GEMINI_FAKE_DELAY", 0))
+
+FAKE_CHUNK_SIZE = 16
+
+FAKE_ERROR_RATE = float(os.getenv("GEMINI_FAKE_ERROR_RATE", 0))
+
+FAKE_ERROR_CODE = int(os.getenv("GEMINI_FAKE_ERROR_CODE", 429))
+
+FAKE_ERROR_STATUSES = {
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    503: "UNAVAILABLE",
+    504: "DEADLINE_EXCEEDED",
+}
+
+
+class FakeAPIError(Exception):
+    """
+    Shaped like google.genai.errors.APIError: an int code and a status.
+    """
+
+    def __init__(self, code):
+
+        self.code = code
+        self.status = FAKE_ERROR_STATUSES.get(code, "UNKNOWN")
+
+        super().__init__(f"{code} {self.status}. Fake Gemini error.")
+
+
+class FakeResponse:
+
+    def __init__(self, text):
+
+        self.text = text
+
+
+class FakeModels:
+
+    def __init__(
+        self,
+        reply=FAKE_REPLY,
+        delay=FAKE_DELAY,
+        chunk_size=FAKE_CHUNK_SIZE,
+        error_rate=FAKE_ERROR_RATE,
+        error_code=FAKE_ERROR_CODE
+    ):
+
+        self.reply = reply
+        self.delay = delay
+        self.chunk_size = chunk_size
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.calls = 0
+
+    def _maybe_fail(self):
+
+        if self.error_rate and random.random() < self.error_rate:
+            raise FakeAPIError(self.error_code)
+
+    def _reply_for(self, contents):
+
+        if self.reply is not None:
+            return self.reply
+
+        return f"Fake answer for a {len(str(contents))}-character prompt."
+
+    def generate_content(self, model, contents, **kwargs):
+
+        self.calls += 1
+
+        if self.delay:
+            time.sleep(self.delay)
+
+        self._maybe_fail()
+
+        return FakeResponse(self._reply_for(contents))
+
+    def generate_content_stream(self, model, contents, **kwargs):
+
+        self.calls += 1
+
+        self._maybe_fail()
+
+        reply = self._reply_for(contents)
+
+        for start in range(0, len(reply), self.chunk_size):
+
+            if self.delay:
+                time.sleep(self.delay)
+
+            yield FakeResponse(reply[start:start + self.chunk_size])
+
+
+class FakeClient:
+
+    def __init__(self, **kwargs):
+
+        self.models = FakeModels(**kwargs)
@@ -1,8 +1,17 @@
 import os
+import threading
 
+import httpx
 from google import genai
+from google.genai import types
 from dotenv import load_dotenv
 
+from planora_app.ai.fake_model import FakeClient
+from planora_app.ai.resilience import gemini_caller
+from planora_app.ai.response_cache import get_response_cache
+from planora_app.ai.utils import estimate_tokens
+from planora_app.utils import enforce_quota
+
 load_dotenv()
 
 # print("=" * 60)
@@ -10,19 +19,159 @@ load_dotenv()
 # print("=" * 60)
 
 MODEL_NAME = "gemini-2.5-flash"
-client = genai.Client(
-    api_key=os.getenv("GEMINI_API_KEY")
+
+# "fake" swaps in the local stand-in from fake_model.py for tests.
+GEMINI_BACKEND = os.getenv("GEMINI_BACKEND", "google")
+
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", 20))
+
+GEMINI_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("GEMINI_MAX_KEEPALIVE_CONNECTIONS", 10)
 )
 
+GEMINI_KEEPALIVE_EXPIRY = float(os.getenv("GEMINI_KEEPALIVE_EXPIRY", 60))
+
+GEMINI_TIMEOUT_MS = int(os.getenv("GEMINI_TIMEOUT_MS", 60000))
+
+# Tokens charged for the answer on top of the prompt, before it exists.
+RESPONSE_TOKEN_ALLOWANCE = int(os.getenv("GEMINI_RESPONSE_TOKEN_ALLOWANCE", 512))
+
+NO_RESPONSE_TEXT = "I couldn't generate a response."
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def _build_client():
+
+    if GEMINI_BACKEND == "fake":
+        return FakeClient()
+
+    return genai.Client(
+        api_key=(
+            os.getenv("GEMINI_API_KEY")
+            or os.getenv("GOOGLE_API_KEY")
+        ),
+        http_options=types.HttpOptions(
+            timeout=GEMINI_TIMEOUT_MS,
+            client_args={
+                "limits": httpx.Limits(
+                    max_connections=GEMINI_MAX_CONNECTIONS,
+                    max_keepalive_connections=GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=GEMINI_KEEPALIVE_EXPIRY
+                )
+            }
+        )
+    )
+
+
+def get_client():
+    """
+    Return the process-wide Gemini client, creating it on first use.
+
+    One client means one keep-alive connection pool, so calls after the
+    first skip the TLS handshake. It is rebuilt after a fork because
+    pooled sockets must not be shared between gunicorn workers.
+    """
+
+    global _client, _client_pid
+
+    if _client is not None and _client_pid == os.getpid():
+        return _client
+
+    with _client_lock:
+
+        if _client is None or _client_pid != os.getpid():
+            _client = _build_client()
+            _client_pid = os.getpid()
+
+        return _client
+
+
+def _charge_quota(user_id, prompt):
 
-def generate_response(prompt):
+    if user_id is not None:
+        enforce_quota(
+            user_id,
+            estimate_tokens(prompt) + RESPONSE_TOKEN_ALLOWANCE
+        )
 
-    response = client.models.generate_content(
-        model=MODEL_NAME,
-        contents=prompt)
+
+def generate_response(prompt, use_cache=True, user_id=None):
+    """
+    Generate a response for prompt. With a user_id the call is charged
+    against that user's daily quota (cache hits are free) and raises
+    QuotaExceeded when it is used up.
+
+    Calls go through gemini_caller, which retries transient errors and
+    raises UpstreamUnavailable while Gemini is overloaded or down.
+    """
+
+    cache = get_response_cache() if use_cache else None
+
+    if cache is not None:
+
+        cached = cache.get(MODEL_NAME, prompt)
+
+        if cached is not None:
+            return cached
+
+    _charge_quota(user_id, prompt)
+
+    response = gemini_caller.call(
+        lambda: get_client().models.generate_content(
+            model=MODEL_NAME,
+            contents=prompt
+        )
+    )
 
     if hasattr(response, "text"):
 
+        if cache is not None and response.text:
+            cache.set(MODEL_NAME, prompt, response.text)
+
         return response.text
 
-    return "I couldn't generate a response."
\ No newline at end of file
+    return NO_RESPONSE_TEXT
+
+
+def generate_response_stream(prompt, use_cache=True, user_id=None):
+    """
+    Yield the response text chunk by chunk as Gemini produces it.
+    The joined text is cached once the stream completes.
+    """
+
+    cache = get_response_cache() if use_cache else None
+
+    if cache is not None:
+
+        cached = cache.get(MODEL_NAME, prompt)
+
+        if cached is not None:
+            yield cached
+            return
+
+    _charge_quota(user_id, prompt)
+
+    parts = []
+
+    for chunk in gemini_caller.stream(
+        lambda: get_client().models.generate_content_stream(
+            model=MODEL_NAME,
+            contents=prompt
+        )
+    ):
+
+        text = getattr(chunk, "text", None)
+
+        if text:
+            parts.append(text)
+            yield text
+
+    if not parts:
+        yield NO_RESPONSE_TEXT
+        return
+
+    if cache is not None:
+        cache.set(MODEL_NAME, prompt, "".join(parts))
@@ -0,0 +1,197 @@
+"""
+Local intent classifier for chat messages.
+
+Handles:
+- routing a message to flashcards, mindmap, summary, off_topic or
+  study_question without a network call
+- weighted keyword features per intent
+- per-intent counters
+
+A message is scored against each intent's patterns. Naming
+flashcards is enough to run them, as it always was. Mindmaps and
+summaries cost a full generation, and both words turn up in ordinary
+questions ("what is a mindmap?", "explain summary judgement"), so
+they also need a verb asking for one (make, create, generate,
+summarize) and no question cue; otherwise the message stays a study
+question. Off-topic needs an
+explicit non-academic request and no study cues; a bare topic word
+such as "weather" or "president" is never enough, because it is just
+as often geography or civics. Anything in doubt goes to Gemini as a
+study question.
+"""
+
+import re
+
+from planora_app.metrics import Metrics
+
+
+INTENTS = (
+    "flashcards",
+    "mindmap",
+    "summary",
+    "off_topic",
+    "study_question",
+)
+
+# Same sentence SYSTEM_PROMPT asks Gemini to use.
+OFF_TOPIC_REPLY = (
+    "I am designed only for academic assistance and study-related questions."
+)
+
+TOOL_THRESHOLD = 4.0
+
+# Tools that only run when asked to make something, never for a
+# question about them.
+MAKE_GATED_TOOLS = ("mindmap", "summary")
+
+OFF_TOPIC_THRESHOLD = 4.0
+
+
+def _patterns(*entries):
+
+    return [
+        (re.compile(pattern, re.IGNORECASE), weight)
+        for pattern, weight in entries
+    ]
+
+
+INTENT_FEATURES = {
+    "flashcards": _patterns(
+        (r"\bflash\s?-?cards?\b", 4.0),
+        (r"\bquiz me\b", 4.0),
+        (r"\b(revision|study) cards\b", 3.0),
+    ),
+    "mindmap": _patterns(
+        (r"\bmind\s?-?maps?\b", 4.0),
+        (r"\bconcept maps?\b", 4.0),
+    ),
+    "summary": _patterns(
+        (r"\bsummar(y|ies|i[sz]e)\b", 3.0),
+        (r"^\s*(please\s+)?summari[sz]e\b", 4.0),
+        (r"\btl;?dr\b", 3.0),
+        (r"\bkey points\b", 1.5),
+        (r"\boverview\b", 1.5),
+        (r"\b(this|the|my) (document|pdf|chapter|notes)\b", 1.0),
+    ),
+    # Explicit requests score 4 and decide alone; topic words only
+    # add to them.
+    "off_topic": _patterns(
+        (r"\b(tell me a joke|who are you dating|date ideas|pick-?up lines?)\b", 4.0),
+        (r"\b(my (girlfriend|boyfriend|crush|ex)|breakup advice)\b", 4.0),
+        (r"\b(horoscope|zodiac sign|song lyrics|stock tips)\b", 4.0),
+        (r"\bshould i (buy|sell|invest)\b", 4.0),
+        (r"\b(what|which) (movie|tv show|series) should i watch\b", 4.0),
+        (r"\b(medicine|dosage|prescription) (should|can) i take\b", 4.0),
+        (r"\b(vote for|which party)\b", 4.0),
+        (r"\b(celebrity|gossip|netflix|crypto|bitcoin|dating|recipe)\b", 1.0),
+        (r"\b(election|politics|movie|sports? scores?)\b", 1.0),
+    ),
+}
+
+REQUEST_CUES = _patterns(
+    (r"\b(make|create|generate|give|build|draw|prepare|produce|write)\b", 1.0),
+    (r"\b(can|could|would) you\b", 1.0),
+    (r"\b(i|we) (want|need)\b", 1.0),
+    (r"\bplease\b", 1.0),
+)
+
+MAKE_CUES = _patterns(
+    (r"\b(make|create|generate|build|draw|prepare|produce)\b", 1.0),
+    (r"\b(give|show|send) me\b", 1.0),
+    (r"\bsummari[sz]e\b", 1.0),
+    (r"\btl;?dr\b", 1.0),
+)
+
+QUESTION_CUES = _patterns(
+    (r"^\s*(what|why|how|when|where|who|which)\b", 1.0),
+    (r"\b(what (is|are|was|were|does)|how (do|does|is|are|to))\b", 1.0),
+    (r"\b(explain|define|describe|meaning of)\b", 1.0),
+)
+
+STUDY_CUES = _patterns(
+    (r"\b(explain|define|definition|derive|prove|proof|solve|calculate)\b", 1.0),
+    (r"\b(exam|homework|assignment|syllabus|chapter|lecture|textbook|study)\b", 1.0),
+    (r"\b(theorem|formula|equation|algorithm|function|code|program)\b", 1.0),
+    (r"\b(biology|chemistry|physics|math\w*|economics|history|geography)\b", 1.0),
+    (r"\b(why|how) (does|do|is|are|did)\b", 1.0),
+    (r"\bwhat (is|are|was|were)\b", 0.5),
+)
+
+
+def _score(features, text):
+
+    return sum(
+        weight
+        for pattern, weight in features
+        if pattern.search(text)
+    )
+
+
+class IntentClassifier:
+
+    def __init__(self):
+
+        self.metrics = Metrics()
+
+    def scores(self, text):
+
+        scores = {
+            intent: _score(features, text)
+            for intent, features in INTENT_FEATURES.items()
+        }
+
+        scores["request"] = _score(REQUEST_CUES, text)
+        scores["make"] = _score(MAKE_CUES, text)
+        scores["question"] = _score(QUESTION_CUES, text)
+        scores["study"] = _score(STUDY_CUES, text)
+
+        return scores
+
+    def classify(self, text):
+        """
+        Return the intent name for a message and count it.
+        """
+
+        intent = self._classify(self.scores(text))
+
+        self.metrics.incr(intent)
+
+        return intent
+
+    def _classify(self, scores):
+
+        asks_to_make = scores["make"] > 0 and scores["question"] == 0
+
+        tool_scores = [
+            (scores[intent] + min(scores["request"], 1.0), intent)
+            for intent in ("flashcards", "mindmap", "summary")
+            if scores[intent] > 0
+            and (intent not in MAKE_GATED_TOOLS or asks_to_make)
+        ]
+
+        if tool_scores:
+
+            best_score, best_intent = max(tool_scores)
+
+            if best_score >= TOOL_THRESHOLD:
+                return best_intent
+
+        if (
+            scores["study"] == 0
+            and scores["off_topic"] >= OFF_TOPIC_THRESHOLD
+        ):
+            return "off_topic"
+
+        return "study_question"
+
+    def counts(self):
+
+        counts = self.metrics.snapshot()
+
+        return {
+            intent: counts.get(intent, 0)
+            for intent in INTENTS
+        }
+
+
+intent_classifier = IntentClassifier()
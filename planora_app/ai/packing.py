@@ -0,0 +1,227 @@
+"""
+Token-budgeted prompt assembly.
+
+Handles:
+- per-segment token estimates
+- packing context by priority into a per-model budget
+- reporting the tokens each segment used
+
+Chat priority: question, conversation summary, recent history,
+retrieved chunks, older history. Whatever does not fit the budget is
+left out, so prompt size and cost stay bounded however long the
+conversation or document gets.
+"""
+
+import os
+
+from planora_app.ai.utils import estimate_tokens
+
+
+MODEL_PROMPT_BUDGETS = {
+    "gemini-2.5-flash": 6000,
+}
+
+DEFAULT_PROMPT_BUDGET = 6000
+
+# Messages counted as "recent" history; older ones are packed last.
+RECENT_HISTORY_MESSAGES = 4
+
+CHAT_TEMPLATE = """
+        {system}
+        Study Material:{study_material}
+        Earlier in this conversation:{summary}
+        Conversation:{conversation}
+        Current Question:{question}
+        Answer: """
+
+CHAT_TEMPLATE_SKELETON = CHAT_TEMPLATE.format(
+    system="",
+    study_material="",
+    summary="",
+    conversation="",
+    question=""
+)
+
+
+def prompt_budget(model):
+    """
+    Token budget for one prompt. PROMPT_TOKEN_BUDGET overrides the
+    per-model default.
+    """
+
+    override = os.getenv("PROMPT_TOKEN_BUDGET")
+
+    if override:
+        return int(override)
+
+    return MODEL_PROMPT_BUDGETS.get(model, DEFAULT_PROMPT_BUDGET)
+
+
+class PackedPrompt:
+
+    def __init__(self, text, segment_tokens, budget, sources=()):
+
+        self.text = text
+        self.segment_tokens = segment_tokens
+        self.budget = budget
+        self.sources = list(sources)
+
+    @property
+    def total_tokens(self):
+
+        return estimate_tokens(self.text)
+
+
+class _Budget:
+
+    def __init__(self, total):
+
+        self.remaining = total
+        self.used = {}
+
+    def reserve(self, segment, text):
+        """
+        Count text that is always sent, even past the budget.
+        """
+
+        tokens = estimate_tokens(text)
+
+        self.remaining -= tokens
+        self.used[segment] = self.used.get(segment, 0) + tokens
+
+    def take(self, segment, text, truncate=False):
+        """
+        Reserve room for text. Returns the text (possibly truncated) or
+        None when it does not fit.
+        """
+
+        tokens = estimate_tokens(text)
+
+        if tokens > self.remaining:
+
+            if not truncate or self.remaining <= 0:
+                return None
+
+            text = text[:len(text) * self.remaining // tokens]
+            tokens = estimate_tokens(text)
+
+        self.remaining -= tokens
+        self.used[segment] = self.used.get(segment, 0) + tokens
+
+        return text
+
+    def take_items(self, segment, items, separator, stop_at_first_miss=False):
+
+        taken = []
+
+        for item in items:
+
+            text = self.take(segment, item + separator)
+
+            if text is not None:
+                taken.append(item)
+            elif stop_at_first_miss:
+                break
+
+        return taken
+
+
+def pack_chat_prompt(
+    system,
+    question,
+    history,
+    chunks,
+    model,
+    summary="",
+    chunk_sources=None
+):
+    """
+    Assemble a chat prompt.
+
+    history is a list of "sender: message" lines, oldest first. chunks
+    are retrieved study material, best first, and chunk_sources names
+    the document of each. summary is the running summary of the turns
+    no longer in history.
+    """
+
+    budget = _Budget(prompt_budget(model))
+
+    budget.reserve("template", CHAT_TEMPLATE_SKELETON)
+    budget.reserve("system", system)
+    question = budget.take("question", question, truncate=True) or ""
+    summary = budget.take("summary", summary, truncate=True) or ""
+
+    split = max(len(history) - RECENT_HISTORY_MESSAGES, 0)
+    older, recent = history[:split], history[split:]
+
+    # History is taken newest first and stops at the first message that
+    # does not fit, so the kept turns stay contiguous.
+    recent = budget.take_items(
+        "recent_history",
+        reversed(recent),
+        "\n",
+        stop_at_first_miss=True
+    )
+
+    taken_chunks = budget.take_items("study_material", chunks, "\n\n")
+
+    # Documents behind the chunks that made it in, in order of first use.
+    sources = []
+
+    if chunk_sources is not None:
+
+        taken = set(taken_chunks)
+
+        for chunk, source in zip(chunks, chunk_sources):
+            if chunk in taken and source not in sources:
+                sources.append(source)
+
+    chunks = taken_chunks
+
+    if len(recent) == len(history) - split:
+        older = budget.take_items(
+            "older_history",
+            reversed(older),
+            "\n",
+            stop_at_first_miss=True
+        )
+    else:
+        older = []
+
+    conversation = "".join(
+        f"{line}\n"
+        for line in list(reversed(older)) + list(reversed(recent))
+    )
+
+    text = CHAT_TEMPLATE.format(
+        system=system,
+        study_material="\n\n".join(chunks),
+        summary=summary,
+        conversation=conversation,
+        question=question
+    )
+
+    return PackedPrompt(text, budget.used, prompt_budget(model), sources)
+
+
+def pack_document_prompt(instructions, chunks, model):
+    """
+    Assemble a generation prompt (flashcards, mindmaps) from fixed
+    instructions followed by as much study material as the budget allows.
+    """
+
+    budget = _Budget(prompt_budget(model))
+
+    budget.reserve("instructions", instructions)
+
+    taken = budget.take_items("study_material", chunks, "\n\n")
+
+    # Never send generation instructions without any material.
+    if not taken and chunks:
+        taken = [budget.take("study_material", chunks[0], truncate=True) or ""]
+
+    chunks = taken
+
+    text = instructions + "\n\n".join(chunks) + "\n"
+
+    return PackedPrompt(text, budget.used, prompt_budget(model))
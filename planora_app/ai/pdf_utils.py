@@ -2,74 +2,191 @@
 PDF utility functions.
 
 Handles:
-- validation
-- saving pdf
-- extracting text
-- page count
+- validation (metadata only: structure, encryption, page count)
+- content-addressed saving in one streaming pass (size, header, hash)
+- extracting text (lazily, per page)
+- parallel extraction of large PDFs across processes
+- page count from metadata
+- cached extraction
 """
 
+import hashlib
+import multiprocessing
 import os
-import uuid
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import fitz
 
+from planora_app.ai.chunking import CHARS_PER_TOKEN
+from planora_app.ai.text_cache import (
+    file_sha256,
+    get_cached_text,
+    store_text
+)
+from planora_app.ai.validators import (
+    InvalidPDF,
+    MAX_FILE_SIZE,
+    MAX_PAGES,
+    PDF_HEADER_WINDOW,
+    allowed_file,
+    check_file_size,
+    check_pdf_header
+)
+
 
 UPLOAD_FOLDER = (
     "planora_app/static/uploads/pdfs"
 )
 
-MAX_FILE_SIZE = 10 * 1024 * 1024      # 10 MB
+UPLOAD_BLOCK_SIZE = 64 * 1024
 
-MAX_PAGES = 100
-
-ALLOWED_EXTENSIONS = {
-    "pdf"
-}
+PARALLEL_EXTRACT_WORKERS = int(
+    os.getenv("PDF_EXTRACT_WORKERS", min(4, os.cpu_count() or 1))
+)
 
-def allowed_file(filename):
+# Below this many pages the pool's startup and IPC cost more than the
+# extraction itself.
+PARALLEL_EXTRACT_MIN_PAGES = int(
+    os.getenv("PDF_PARALLEL_MIN_PAGES", 24)
+)
 
-    if "." not in filename:
-        return False
 
-    extension = (
-        filename
-        .rsplit(".", 1)[1]
-        .lower()
-    )
+def save_pdf(file, retain):
+    """
+    Store an upload under the SHA-256 of its content, in one pass.
 
-    return extension in ALLOWED_EXTENSIONS
+    The request stream is copied to a temp file in fixed-size blocks
+    while the size limit and %PDF- header are checked and the content
+    hashed. A violation raises InvalidPDF as soon as it is seen and the
+    partial file is removed. Identical uploads resolve to one blob and
+    the duplicate copy is discarded.
 
+    retain(content_hash, stored_filename, file_size) takes a reference
+    on the blob and returns the count held before it. It runs before
+    the stored file is checked, so a concurrent release cannot delete
+    the file once this upload has decided to reuse it. The caller owns
+    that reference.
 
-def save_pdf(file):
+    Returns (stored_filename, save_path, content_hash, file_size).
+    """
 
     os.makedirs(
         UPLOAD_FOLDER,
         exist_ok=True
     )
 
-    unique_name = (
-        f"{uuid.uuid4()}.pdf"
+    digest = hashlib.sha256()
+
+    fd, temp_path = tempfile.mkstemp(
+        dir=UPLOAD_FOLDER,
+        suffix=".part"
+    )
+
+    file_size = 0
+    head = b""
+
+    try:
+        with os.fdopen(fd, "wb") as handle:
+
+            for block in iter(lambda: file.stream.read(UPLOAD_BLOCK_SIZE), b""):
+
+                file_size += len(block)
+                check_file_size(file_size)
+
+                if len(head) < PDF_HEADER_WINDOW:
+
+                    head += block[:PDF_HEADER_WINDOW - len(head)]
+
+                    if len(head) >= PDF_HEADER_WINDOW:
+                        check_pdf_header(head)
+
+                digest.update(block)
+                handle.write(block)
+
+        if len(head) < PDF_HEADER_WINDOW:
+            check_pdf_header(head)
+
+        content_hash = digest.hexdigest()
+
+        stored_filename = (
+            f"{content_hash}.pdf"
+        )
+
+        save_path = os.path.join(
+            UPLOAD_FOLDER,
+            stored_filename
+        )
+
+        previous_refs = retain(
+            content_hash,
+            stored_filename,
+            file_size
+        )
+
+        # With no earlier reference the file may be mid-deletion by the
+        # last release, so it is always written again.
+        if previous_refs > 0 and os.path.exists(save_path):
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, save_path)
+
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return (
+        stored_filename,
+        save_path,
+        content_hash,
+        file_size
     )
 
-    save_path = os.path.join(
+
+def pdf_path_for(stored_filename):
+
+    return os.path.join(
         UPLOAD_FOLDER,
-        unique_name
+        stored_filename
     )
 
-    file.save(save_path)
 
-    return (
-        unique_name,
-        save_path
+def pdf_index_path(content_hash, kind):
+    """
+    Path of a per-document index stored next to its PDF blob.
+    """
+
+    return os.path.join(
+        UPLOAD_FOLDER,
+        f"{content_hash}.{kind}.npz"
     )
 
 
-def extract_pdf_text(pdf_path):
+INDEX_KINDS = (
+    "vectors",
+    "bm25",
+)
 
-    document = fitz.open(pdf_path)
 
-    page_count = len(document)
+def _text_budget(max_chars=None, max_tokens=None):
+
+    if max_tokens is not None:
+
+        token_chars = max_tokens * CHARS_PER_TOKEN
+
+        if max_chars is None or token_chars < max_chars:
+            return token_chars
 
-    if page_count > MAX_PAGES:
+    return max_chars
+
+
+def _open_pdf(pdf_path):
+
+    document = fitz.open(pdf_path)
+
+    # page_count comes from the page tree, no page content is parsed.
+    if document.page_count > MAX_PAGES:
 
         document.close()
 
@@ -77,19 +194,254 @@ def extract_pdf_text(pdf_path):
             "PDF exceeds maximum page limit."
         )
 
-    extracted_text = ""
+    return document
+
+
+def _iter_document_pages(document, budget):
+
+    used = 0
 
-    for page in document:
+    for page_number in range(document.page_count):
 
-        extracted_text += (
-            page.get_text()
+        page_text = (
+            document.load_page(page_number).get_text()
             + "\n"
         )
 
+        yield page_text
+
+        used += len(page_text)
+
+        if budget is not None and used >= budget:
+            return
+
+
+def inspect_pdf(pdf_path):
+    """
+    Validate a PDF from its metadata alone and return its page count.
+
+    Opening a document reads the trailer, cross-reference table and
+    page tree; no page content is parsed, so the cost does not grow
+    with the amount of text. Raises InvalidPDF for unreadable,
+    password-protected, empty or oversized documents.
+    """
+
+    try:
+        document = fitz.open(pdf_path, filetype="pdf")
+
+    except Exception:
+        raise InvalidPDF("The file is not a valid PDF.")
+
+    try:
+        if not document.is_pdf:
+            raise InvalidPDF("The file is not a valid PDF.")
+
+        if document.needs_pass:
+            raise InvalidPDF("Password-protected PDFs are not supported.")
+
+        if document.page_count == 0:
+            raise InvalidPDF("The PDF has no pages.")
+
+        if document.page_count > MAX_PAGES:
+            raise InvalidPDF("PDF exceeds maximum page limit.")
+
+        return document.page_count
+
+    finally:
+        document.close()
+
+
+def pdf_page_count(pdf_path):
+
+    document = _open_pdf(pdf_path)
+
+    page_count = document.page_count
+
     document.close()
 
+    return page_count
+
+
+def iter_pdf_pages(pdf_path, max_chars=None, max_tokens=None):
+    """
+    Yield page texts lazily, stopping once the character or token
+    budget is covered. Pages after the cutoff are never parsed.
+    """
+
+    document = _open_pdf(pdf_path)
+
+    try:
+        yield from _iter_document_pages(
+            document,
+            _text_budget(max_chars, max_tokens)
+        )
+
+    finally:
+        document.close()
+
+
+_extract_pool = None
+_extract_pool_pid = None
+_extract_pool_lock = threading.Lock()
+
+
+def _get_extract_pool():
+    """
+    Process pool for parallel extraction, created on first use and
+    again after a fork. forkserver (spawn where unavailable) keeps the
+    children free of the parent's threads and sockets.
+    """
+
+    global _extract_pool, _extract_pool_pid
+
+    with _extract_pool_lock:
+
+        if _extract_pool is None or _extract_pool_pid != os.getpid():
+
+            method = (
+                "forkserver"
+                if "forkserver" in multiprocessing.get_all_start_methods()
+                else "spawn"
+            )
+
+            _extract_pool = ProcessPoolExecutor(
+                max_workers=PARALLEL_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context(method)
+            )
+            _extract_pool_pid = os.getpid()
+
+        return _extract_pool
+
+
+def _extract_page_range(pdf_path, start, stop):
+    """
+    Worker side: open the PDF independently and return the text of
+    pages [start, stop).
+    """
+
+    document = fitz.open(pdf_path)
+
+    try:
+        return "".join(
+            document.load_page(page_number).get_text() + "\n"
+            for page_number in range(start, stop)
+        )
+
+    finally:
+        document.close()
+
+
+def _page_ranges(page_count, parts):
+
+    size = -(-page_count // parts)
+
+    return [
+        (start, min(start + size, page_count))
+        for start in range(0, page_count, size)
+    ]
+
+
+def extract_pdf_text_parallel(pdf_path, page_count, workers=None):
+    """
+    Extract every page by splitting the document into one contiguous
+    page range per worker. Ranges are joined back in page order.
+    """
+
+    workers = workers or PARALLEL_EXTRACT_WORKERS
+
+    pool = _get_extract_pool()
+
+    futures = [
+        pool.submit(_extract_page_range, pdf_path, start, stop)
+        for start, stop in _page_ranges(page_count, workers)
+    ]
+
+    return "".join(future.result() for future in futures)
+
+
+def _use_parallel(page_count, budget):
+
+    return (
+        budget is None
+        and PARALLEL_EXTRACT_WORKERS > 1
+        and page_count >= PARALLEL_EXTRACT_MIN_PAGES
+    )
+
+
+def extract_pdf_text(pdf_path, max_chars=None, max_tokens=None, parallel=None):
+    """
+    Return (text, page_count). Full extractions of large PDFs run on
+    the process pool unless parallel=False; budgeted extractions stay
+    serial since they stop after the first few pages.
+    """
+
+    budget = _text_budget(max_chars, max_tokens)
+
+    document = _open_pdf(pdf_path)
+
+    try:
+        page_count = document.page_count
+
+        if parallel is None:
+            parallel = _use_parallel(page_count, budget)
+
+        if parallel:
+            extracted_text = None
+        else:
+            extracted_text = "".join(
+                _iter_document_pages(document, budget)
+            )
+
+    finally:
+        document.close()
+
+    if extracted_text is None:
+        extracted_text = extract_pdf_text_parallel(pdf_path, page_count)
+
+    if budget is not None:
+        extracted_text = extracted_text[:budget]
+
     return (
         extracted_text,
         page_count
     )
-    
+
+
+def get_pdf_text(pdf_path, content_hash=None, max_chars=None, max_tokens=None):
+    """
+    Cached variant of extract_pdf_text.
+
+    The cache is keyed by the SHA-256 of the file content. Pass the hash
+    stored on the chat document when available to avoid re-hashing.
+    Only complete extractions are cached; on a miss with a budget the
+    pages past the cutoff are skipped.
+    """
+
+    if content_hash is None:
+        content_hash = file_sha256(pdf_path)
+
+    budget = _text_budget(max_chars, max_tokens)
+
+    cached = get_cached_text(content_hash)
+
+    if cached is not None:
+
+        text, page_count = cached
+
+        if budget is not None:
+            text = text[:budget]
+
+        return (
+            text,
+            page_count
+        )
+
+    text, page_count = extract_pdf_text(pdf_path, budget)
+
+    if budget is None:
+        store_text(content_hash, text, page_count)
+
+    return (
+        text,
+        page_count
+    )
@@ -0,0 +1,373 @@
+"""
+Resilience layer for Gemini calls.
+
+Handles:
+- an AIMD concurrency cap on in-flight requests
+- jittered exponential backoff on retryable errors (429, 5xx, timeouts)
+- a circuit breaker that fails fast while the upstream is unhealthy
+- counters and gauges for every state
+
+All state is per process.
+"""
+
+import os
+import random
+import threading
+import time
+
+import httpx
+
+from planora_app.metrics import Metrics
+
+
+MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 16))
+
+INITIAL_CONCURRENCY = int(os.getenv("GEMINI_INITIAL_CONCURRENCY", 4))
+
+# How long a request waits for a concurrency slot before giving up.
+ACQUIRE_TIMEOUT = float(os.getenv("GEMINI_ACQUIRE_TIMEOUT", 10))
+
+MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 3))
+
+BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", 0.5))
+
+BACKOFF_CAP = float(os.getenv("GEMINI_BACKOFF_CAP", 8))
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", 5))
+
+BREAKER_RESET_SECONDS = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", 30))
+
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+RETRYABLE_STATUSES = ("RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED")
+
+
+class UpstreamUnavailable(Exception):
+    """
+    Raised without calling Gemini: the circuit is open or no
+    concurrency slot freed up in time.
+    """
+
+
+def _error_code(error):
+
+    code = getattr(error, "code", None)
+
+    return code if isinstance(code, int) else None
+
+
+def is_overload(error):
+
+    return (
+        _error_code(error) == 429
+        or "RESOURCE_EXHAUSTED" in str(error)
+    )
+
+
+def is_retryable(error):
+
+    if isinstance(error, (httpx.TimeoutException, httpx.TransportError)):
+        return True
+
+    if _error_code(error) in RETRYABLE_CODES:
+        return True
+
+    message = str(error)
+
+    return any(status in message for status in RETRYABLE_STATUSES)
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase / multiplicative-decrease cap on in-flight calls.
+
+    Each success raises the limit by 1/limit (about +1 per round of
+    calls); each overload signal halves it.
+    """
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, minimum=1, maximum=MAX_CONCURRENCY):
+
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout=ACQUIRE_TIMEOUT):
+
+        deadline = time.monotonic() + timeout
+
+        with self._condition:
+
+            while self.in_flight >= int(self.limit):
+
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    return False
+
+                self._condition.wait(remaining)
+
+            self.in_flight += 1
+
+            return True
+
+    def release(self, outcome):
+        """
+        outcome is "success", "overload" or "failure". Plain failures
+        leave the limit unchanged.
+        """
+
+        with self._condition:
+
+            self.in_flight -= 1
+
+            if outcome == "success":
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+            elif outcome == "overload":
+                self.limit = max(self.minimum, self.limit / 2)
+
+            self._condition.notify_all()
+
+
+class CircuitBreaker:
+    """
+    closed -> open after failure_threshold consecutive failures.
+    open -> half_open after reset_seconds; one trial call is let through.
+    half_open -> closed on success, back to open on failure.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+
+        with self._lock:
+
+            if self.state == "closed":
+                return True
+
+            if self.state == "open":
+
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    return False
+
+                self.state = "half_open"
+                self._trial_in_flight = False
+
+            if self._trial_in_flight:
+                return False
+
+            self._trial_in_flight = True
+
+            return True
+
+    def cancel_trial(self):
+        """
+        Give back a half-open trial that never reached the upstream.
+        """
+
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+
+        with self._lock:
+
+            self.failures += 1
+            self._trial_in_flight = False
+
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class ResilientCaller:
+
+    def __init__(
+        self,
+        limiter=None,
+        breaker=None,
+        max_retries=MAX_RETRIES,
+        backoff_base=BACKOFF_BASE,
+        backoff_cap=BACKOFF_CAP,
+        sleep=time.sleep
+    ):
+
+        self.limiter = limiter or AdaptiveLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.metrics = Metrics()
+        self._sleep = sleep
+
+    def _backoff(self, attempt):
+
+        # Full jitter: spreads retries from many workers apart.
+        return random.uniform(
+            0,
+            min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+        )
+
+    def _admit(self):
+        """
+        Checked once per call(); retries reuse the admission.
+        """
+
+        if not self.breaker.allow():
+            self.metrics.incr("rejected_circuit_open")
+            raise UpstreamUnavailable("Gemini circuit is open.")
+
+    def _enter(self):
+
+        if not self.limiter.acquire():
+            self.metrics.incr("rejected_concurrency")
+            raise UpstreamUnavailable("Too many Gemini requests in flight.")
+
+        self.metrics.incr("calls")
+
+    def _exit(self, error):
+
+        if error is None:
+            self.limiter.release("success")
+            self.metrics.incr("successes")
+            return
+
+        overload = is_overload(error)
+
+        self.limiter.release("overload" if overload else "failure")
+        self.metrics.incr("overloads" if overload else "failures")
+
+    def _settle(self, error):
+        """
+        Record the outcome of a whole call() on the breaker. Only
+        retryable errors (overload, 5xx, timeouts) mean the upstream is
+        unhealthy; a 4xx or a rejected slot says nothing about it.
+        """
+
+        if error is None:
+            self.breaker.record_success()
+
+        elif is_retryable(error):
+            self.breaker.record_failure()
+
+        else:
+            self.breaker.cancel_trial()
+
+    def _should_retry(self, error, attempt):
+
+        if attempt >= self.max_retries or not is_retryable(error):
+            return False
+
+        self.metrics.incr("retries")
+        self._sleep(self._backoff(attempt))
+
+        return True
+
+    def call(self, fn):
+
+        self._admit()
+
+        attempt = 0
+
+        while True:
+
+            try:
+                self._enter()
+
+            except UpstreamUnavailable as error:
+                self._settle(error)
+                raise
+
+            try:
+                result = fn()
+
+            except Exception as error:
+                self._exit(error)
+
+                if self._should_retry(error, attempt):
+                    attempt += 1
+                    continue
+
+                self._settle(error)
+                raise
+
+            self._exit(None)
+            self._settle(None)
+
+            return result
+
+    def stream(self, fn):
+        """
+        Like call() for a function returning an iterator. Retries only
+        happen before the first item is yielded; the concurrency slot is
+        held until the stream ends.
+        """
+
+        self._admit()
+
+        attempt = 0
+
+        while True:
+
+            try:
+                self._enter()
+
+            except UpstreamUnavailable as error:
+                self._settle(error)
+                raise
+
+            started = False
+
+            try:
+                for item in fn():
+                    started = True
+                    yield item
+
+            except GeneratorExit:
+                self._exit(None)
+                self._settle(None)
+                raise
+
+            except Exception as error:
+                self._exit(error)
+
+                if not started and self._should_retry(error, attempt):
+                    attempt += 1
+                    continue
+
+                self._settle(error)
+                raise
+
+            self._exit(None)
+            self._settle(None)
+
+            return
+
+    def stats(self):
+
+        return {
+            **self.metrics.snapshot(),
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "in_flight": self.limiter.in_flight,
+            "circuit_state": self.breaker.state
+        }
+
+
+gemini_caller = ResilientCaller()
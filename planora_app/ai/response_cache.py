@@ -0,0 +1,250 @@
+"""
+Response cache for Gemini calls.
+
+Handles:
+- keys from a hash of (model, prompt)
+- TTL expiry, size bound and LRU eviction
+- hit / miss counters
+- in-process and disk-backed (sqlite) backends
+
+The disk backend is shared by every gunicorn worker on the host and
+survives worker restarts.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+RESPONSE_CACHE_BACKEND = os.getenv("GEMINI_RESPONSE_CACHE", "memory")
+
+RESPONSE_CACHE_TTL = int(
+    os.getenv("GEMINI_RESPONSE_CACHE_TTL", 24 * 60 * 60)
+)
+
+RESPONSE_CACHE_MAX_ENTRIES = int(
+    os.getenv("GEMINI_RESPONSE_CACHE_MAX_ENTRIES", 1000)
+)
+
+RESPONSE_CACHE_PATH = os.getenv(
+    "GEMINI_RESPONSE_CACHE_PATH",
+    "planora_app/cache/responses.sqlite3"
+)
+
+
+def response_key(model, prompt):
+
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    Base class. Backends implement _get, _set and __len__.
+    """
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    def get(self, model, prompt):
+
+        value = self._get(response_key(model, prompt), time.time())
+
+        with self._counter_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return value
+
+    def set(self, model, prompt, value):
+
+        self._set(response_key(model, prompt), value, time.time())
+
+    def stats(self):
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self)
+        }
+
+
+class MemoryResponseCache(ResponseCache):
+
+    def __init__(self, **kwargs):
+
+        super().__init__(**kwargs)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+
+        return len(self._entries)
+
+    def _get(self, key, now):
+
+        with self._lock:
+
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+
+            return value
+
+    def _set(self, key, value, now):
+
+        with self._lock:
+
+            self._entries[key] = (value, now + self.ttl)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class DiskResponseCache(ResponseCache):
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, **kwargs):
+
+        super().__init__(**kwargs)
+        self.path = path
+
+        directory = os.path.dirname(path)
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, "
+                "value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, "
+                "last_used REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_used "
+                "ON responses (last_used)"
+            )
+
+    @contextmanager
+    def _connect(self):
+
+        # One short-lived connection per call keeps this safe across
+        # threads and forked workers.
+        connection = sqlite3.connect(self.path, timeout=5)
+
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def __len__(self):
+
+        with self._connect() as connection:
+            return connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+
+    def _get(self, key, now):
+
+        with self._connect() as connection:
+
+            row = connection.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            value, expires_at = row
+
+            if expires_at <= now:
+                connection.execute(
+                    "DELETE FROM responses WHERE key = ?",
+                    (key,)
+                )
+                return None
+
+            connection.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?",
+                (now, key)
+            )
+
+            return value
+
+    def _set(self, key, value, now):
+
+        with self._connect() as connection:
+
+            connection.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now)
+            )
+
+            connection.execute(
+                "DELETE FROM responses WHERE expires_at <= ?",
+                (now,)
+            )
+
+            connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Return the configured cache backend, or None when caching is off.
+    """
+
+    global _cache
+
+    if RESPONSE_CACHE_BACKEND == "off":
+        return None
+
+    if _cache is None:
+
+        with _cache_lock:
+
+            if _cache is None:
+
+                if RESPONSE_CACHE_BACKEND == "disk":
+                    _cache = DiskResponseCache()
+                else:
+                    _cache = MemoryResponseCache()
+
+    return _cache
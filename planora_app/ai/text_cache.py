@@ -0,0 +1,139 @@
+"""
+Extracted-text cache for uploaded PDFs.
+
+Handles:
+- content hashing
+- compressed on-disk storage keyed by SHA-256
+- size-bounded LRU eviction
+
+Entries are shared by every conversation, flashcard set and mindmap
+built from the same file, so PyMuPDF only runs once per unique PDF.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+
+
+CACHE_FOLDER = os.getenv(
+    "PDF_TEXT_CACHE_FOLDER",
+    "planora_app/cache/pdf_text"
+)
+
+CACHE_MAX_BYTES = int(
+    os.getenv("PDF_TEXT_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+)
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as handle:
+
+        for block in iter(lambda: handle.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def _entry_path(content_hash):
+
+    return os.path.join(
+        CACHE_FOLDER,
+        f"{content_hash}.json.z"
+    )
+
+
+def get_cached_text(content_hash):
+    """
+    Return (text, page_count) for a cached file, or None on a miss.
+    A hit refreshes the entry's mtime, which is the LRU clock.
+    """
+
+    path = _entry_path(content_hash)
+
+    try:
+        with open(path, "rb") as handle:
+            payload = json.loads(zlib.decompress(handle.read()))
+
+        os.utime(path, None)
+
+    except (OSError, ValueError, zlib.error):
+        return None
+
+    return (
+        payload["text"],
+        payload["page_count"]
+    )
+
+
+def store_text(content_hash, text, page_count):
+
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+
+    payload = zlib.compress(
+        json.dumps({
+            "text": text,
+            "page_count": page_count
+        }).encode("utf-8"),
+        6
+    )
+
+    # Write to a temp file first so concurrent readers in other
+    # workers never see a half-written entry.
+    fd, temp_path = tempfile.mkstemp(dir=CACHE_FOLDER, suffix=".tmp")
+
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(payload)
+
+        os.replace(temp_path, _entry_path(content_hash))
+
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return
+
+    _evict()
+
+
+def _evict():
+    """
+    Drop least recently used entries until the cache fits CACHE_MAX_BYTES.
+    """
+
+    entries = []
+    total = 0
+
+    try:
+        with os.scandir(CACHE_FOLDER) as scan:
+            for entry in scan:
+                if not entry.name.endswith(".json.z"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+    except OSError:
+        return
+
+    if total <= CACHE_MAX_BYTES:
+        return
+
+    entries.sort()
+
+    for _, size, path in entries:
+
+        if total <= CACHE_MAX_BYTES:
+            break
+
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
@@ -0,0 +1,116 @@
+"""
+Shared text helpers for the AI package.
+"""
+
+import math
+import os
+import re
+from functools import lru_cache
+
+from planora_app.ai.chunking import CHARS_PER_TOKEN
+
+
+INDEX_CACHE_SIZE = int(
+    os.getenv("RETRIEVAL_INDEX_CACHE_SIZE", 32)
+)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do",
+    "does", "explain", "for", "from", "how", "i", "in", "is", "it",
+    "me", "of", "on", "or", "please", "that", "the", "this", "to",
+    "was", "what", "when", "where", "which", "who", "why", "with",
+    "you"
+})
+
+
+def estimate_tokens(text):
+    """
+    Local token estimate for budgeting; no call to the tokenizer API.
+    """
+
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def tokenize(text):
+    """
+    Lowercase word tokens without stop words or single letters, used
+    by the local retrieval indexes.
+    """
+
+    return [
+        token
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def strip_code_fences(text, language=""):
+    """
+    Remove a markdown fence (```json, ```mermaid, ...) that the model
+    sometimes wraps around output it was asked to return bare.
+    """
+
+    cleaned = text.strip()
+
+    if language and cleaned.startswith(f"```{language}"):
+        cleaned = cleaned.replace(f"```{language}", "", 1)
+
+    if cleaned.startswith("```"):
+        cleaned = cleaned.replace("```", "", 1)
+
+    if cleaned.endswith("```"):
+        cleaned = cleaned[:-3]
+
+    return cleaned.strip()
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Merge several [(item, score)] rankings, best first, into one.
+
+    Only ranks are used, so scores on different scales (cosine, BM25)
+    can be combined without normalisation.
+    """
+
+    fused = {}
+
+    for ranking in rankings:
+        for rank, (item, _) in enumerate(ranking):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank + 1)
+
+    return sorted(
+        fused.items(),
+        key=lambda entry: entry[1],
+        reverse=True
+    )
+
+
+@lru_cache(maxsize=INDEX_CACHE_SIZE)
+def _load_index(index_class, index_path):
+
+    return index_class.load(index_path)
+
+
+def load_or_build_index(index_class, index_path, load_text):
+    """
+    Return a persisted per-document index, building it from load_text()
+    and saving it next to the PDF when it does not exist yet. Loaded
+    indexes are kept in a small in-process LRU.
+    """
+
+    try:
+        return _load_index(index_class, index_path)
+
+    except (OSError, ValueError, KeyError):
+        pass
+
+    index = index_class.build(load_text())
+
+    try:
+        index.save(index_path)
+    except OSError:
+        return index
+
+    return _load_index(index_class, index_path)
@@ -1,10 +1,33 @@
+"""
+Upload rules for study PDFs.
+
+Handles:
+- allowed extensions
+- size limit, checked while the upload is streamed
+- %PDF- header check on the first block
+- page limit, checked from metadata in pdf_utils.inspect_pdf
+
+pdf_utils.save_pdf applies these in the same pass that hashes and
+stores the file.
+"""
+
 from pathlib import Path
-import os
 
 ALLOWED_EXTENSIONS = {".pdf"}
 
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
-MAX_PDF_PAGES = 100
+MAX_PAGES = 100
+
+PDF_MAGIC = b"%PDF-"
+
+# Readers accept a few bytes of junk before the header, as PyMuPDF does.
+PDF_HEADER_WINDOW = 1024
+
+
+class InvalidPDF(ValueError):
+    """
+    Raised when an upload is not a PDF Planora can read.
+    """
 
 
 def allowed_file(filename):
@@ -14,12 +37,19 @@ def allowed_file(filename):
     return extension in ALLOWED_EXTENSIONS
 
 
-def validate_file_size(file):
+def check_pdf_header(head):
+    """
+    head is the start of the upload, at least PDF_HEADER_WINDOW bytes
+    unless the file is shorter.
+    """
 
-    file.seek(0, os.SEEK_END)
+    if PDF_MAGIC not in head[:PDF_HEADER_WINDOW]:
+        raise InvalidPDF("The file is not a valid PDF.")
 
-    size = file.tell()
 
-    file.seek(0)
+def check_file_size(size):
 
-    return size <= MAX_FILE_SIZE
\ No newline at end of file
+    if size > MAX_FILE_SIZE:
+        raise InvalidPDF(
+            f"Maximum file size is {MAX_FILE_SIZE // (1024 * 1024)} MB"
+        )
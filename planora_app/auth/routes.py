@@ -6,10 +6,19 @@ import bcrypt
 from authlib.integrations.flask_client import OAuth
 
 from planora_app.extensions import get_db
+from planora_app.indexes import register_index, register_hot_query
 
 auth = Blueprint("auth", __name__, url_prefix="/auth")
 oauth = OAuth()
 
+register_index("users", [("email", 1)])
+register_index("users", [("username", 1)])
+register_index("users", [("reset_token", 1)], sparse=True)
+register_index("users", [("oauth_provider", 1), ("oauth_id", 1)], sparse=True)
+
+register_hot_query("user by email", "users", {"email": "student@example.com"})
+register_hot_query("user by reset token", "users", {"reset_token": "token"})
+
 
 def _forgot_password_debug(message):
     print(f"[PLANORA][forgot-password] {message}", flush=True)
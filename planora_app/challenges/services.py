@@ -1,9 +1,23 @@
 import datetime
 import pytz
 from planora_app.dashboard.cards_services import get_priority_focus
+from planora_app.pomodoro.streak_services import get_streak
+from planora_app.indexes import register_index, register_hot_query
 
 IST = pytz.timezone("Asia/Kolkata")
 
+register_index("challenges", [("user_id", 1), ("challenge_id", 1)])
+
+register_hot_query(
+    "user challenge", "challenges",
+    {"user_id": "user", "challenge_id": "ch1"}
+)
+
+register_hot_query(
+    "sessions this week", "sessions",
+    {"user_id": "user", "start_time": {"$gte": datetime.datetime(2026, 1, 1)}}
+)
+
 # Master list of challenges
 CANONICAL_CHALLENGES = [
     {
@@ -89,10 +103,40 @@ def assign_challenges_for_week(db, user_id):
     return True
 
 
-# ✅ Update streak progress
+def week_start_day(ch):
+    """IST date (YYYY-MM-DD) a challenge's week starts on."""
+    week_start = ch.get("week_start")
+
+    if not isinstance(week_start, datetime.datetime):
+        return get_current_ist_date().strftime("%Y-%m-%d")
+
+    # Mongo hands datetimes back as naive UTC
+    if week_start.tzinfo is None:
+        week_start = pytz.utc.localize(week_start)
+
+    # week_start is a local midnight, stored with pytz's LMT offset by
+    # to_datetime(); the nearest day absorbs those extra minutes.
+    week_start = week_start.astimezone(IST) + datetime.timedelta(hours=12)
+
+    return week_start.strftime("%Y-%m-%d")
+
+
+def streak_days_this_week(streak, week_day):
+    """Days of the live streak that fall on or after week_day."""
+    if not streak or not streak["current"] or streak["last_day"] < week_day:
+        return 0
+
+    days_since_start = (
+        datetime.datetime.strptime(streak["last_day"], "%Y-%m-%d")
+        - datetime.datetime.strptime(week_day, "%Y-%m-%d")
+    ).days + 1
+
+    return min(streak["current"], days_since_start)
+
+
+# ✅ Update streak progress from the shared streak state
 def update_3day_streak(db, user_id):
     coll = db["challenges"]
-    today = get_current_ist_date()
 
     ch = coll.find_one(
         {
@@ -104,38 +148,35 @@ def update_3day_streak(db, user_id):
     if not ch or ch.get("status") == "completed":
         return
 
-    last_update = ch.get("last_updated")
+    streak = get_streak(user_id, db)
 
-    last_date = (
-        last_update.astimezone(IST).date()
-        if last_update
-        else None
+    streak_count = min(
+        streak_days_this_week(streak, week_start_day(ch)),
+        3
     )
 
-    streak_count = ch.get("streak_count", 0)
-
-    if last_date != today:
-        streak_count += 1
+    if streak_count == ch.get("streak_count", 0):
+        return
 
-        status = (
-            "in progress"
-            if streak_count < 3
-            else "completed"
-        )
+    status = (
+        "in progress"
+        if streak_count < 3
+        else "completed"
+    )
 
-        progress = int((streak_count / 3) * 100)
+    progress = int((streak_count / 3) * 100)
 
-        coll.update_one(
-            {"_id": ch["_id"]},
-            {
-                "$set": {
-                    "streak_count": streak_count,
-                    "status": status,
-                    "progress": progress,
-                    "last_updated": datetime.datetime.now(IST),
-                }
-            },
-        )
+    coll.update_one(
+        {"_id": ch["_id"]},
+        {
+            "$set": {
+                "streak_count": streak_count,
+                "status": status,
+                "progress": progress,
+                "last_updated": datetime.datetime.now(IST),
+            }
+        },
+    )
 
 
 
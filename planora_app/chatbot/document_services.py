@@ -1,6 +1,29 @@
+import os
 from datetime import datetime, UTC
 
+from pymongo import ReturnDocument
+
 from planora_app.extensions import get_db
+from planora_app.ai.pdf_utils import (
+    INDEX_KINDS,
+    get_pdf_text,
+    pdf_index_path,
+    pdf_path_for
+)
+from planora_app.ai.text_cache import file_sha256
+from planora_app.ai.answer_cache import answer_cache
+from planora_app.ai.embeddings import get_document_index
+from planora_app.ai.bm25 import get_keyword_index
+from planora_app.indexes import register_index, register_hot_query
+
+
+register_index("chat_documents", [("conversation_id", 1), ("is_active", 1)])
+register_index("chat_documents", [("conversation_id", 1), ("created_at", -1)])
+
+register_hot_query(
+    "active document", "chat_documents",
+    {"conversation_id": "conversation", "is_active": True}
+)
 
 
 def save_document(
@@ -47,4 +70,188 @@ def get_conversation_documents(conversation_id):
 
         })
 
-    )
\ No newline at end of file
+    )
+
+
+def retain_pdf_blob(content_hash, stored_filename, file_size):
+    """
+    Add a reference to a content-addressed PDF blob. Returns the
+    reference count before this one.
+    """
+
+    db = get_db()
+
+    blob = db.pdf_blobs.find_one_and_update(
+        {
+            "_id": content_hash
+        },
+        {
+            "$inc": {
+                "ref_count": 1
+            },
+            "$setOnInsert": {
+                "stored_filename": stored_filename,
+                "file_size": file_size,
+                "created_at": datetime.now(UTC)
+            }
+        },
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+
+    return blob["ref_count"] if blob else 0
+
+
+def release_pdf_blob(content_hash):
+    """
+    Drop a reference to a PDF blob and delete the file once nothing
+    points at it anymore.
+    """
+
+    db = get_db()
+
+    blob = db.pdf_blobs.find_one_and_update(
+        {
+            "_id": content_hash
+        },
+        {
+            "$inc": {
+                "ref_count": -1
+            }
+        },
+        return_document=ReturnDocument.AFTER
+    )
+
+    if not blob or blob["ref_count"] > 0:
+        return
+
+    deleted = db.pdf_blobs.delete_one({
+        "_id": content_hash,
+        "ref_count": {"$lte": 0}
+    })
+
+    if deleted.deleted_count == 0:
+        return
+
+    if answer_cache is not None:
+        answer_cache.invalidate(content_hash)
+
+    remove_unreferenced_pdf(blob["stored_filename"], content_hash)
+
+
+def remove_unreferenced_pdf(stored_filename, content_hash):
+    """
+    Delete a stored PDF and its indexes unless a pdf_blobs entry
+    still points at it.
+    """
+
+    db = get_db()
+
+    if db.pdf_blobs.find_one({"_id": content_hash}):
+        return
+
+    paths = [pdf_path_for(stored_filename)] + [
+        pdf_index_path(content_hash, kind)
+        for kind in INDEX_KINDS
+    ]
+
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def load_document_indexes(pdf_path, content_hash):
+    """
+    Return the (vector, keyword) indexes for a PDF blob, building and
+    persisting any that are missing.
+    """
+
+    def load_text():
+        return get_pdf_text(pdf_path, content_hash)[0]
+
+    return (
+        get_document_index(
+            pdf_index_path(content_hash, "vectors"),
+            load_text
+        ),
+        get_keyword_index(
+            pdf_index_path(content_hash, "bm25"),
+            load_text
+        )
+    )
+
+
+def conversation_content_hashes(conversation_id):
+    """
+    Content hashes of a conversation's documents, or None when any of
+    them predates content addressing.
+    """
+
+    hashes = [
+        document.get("content_hash")
+        for document in get_conversation_documents(conversation_id)
+    ]
+
+    if not all(hashes):
+        return None
+
+    return hashes
+
+
+def load_conversation_indexes(conversation_id):
+    """
+    Return [(document, vector_index, keyword_index)] for every document
+    of a conversation, the active one first.
+
+    Indexes are built at ingest and kept in an in-process LRU, so a
+    query only pays a lookup per document. Documents whose index cannot
+    be loaded are skipped.
+    """
+
+    documents = sorted(
+        get_conversation_documents(conversation_id),
+        key=lambda document: not document.get("is_active", False)
+    )
+
+    loaded = []
+
+    for document in documents:
+
+        pdf_path = pdf_path_for(document["stored_filename"])
+
+        try:
+            content_hash = (
+                document.get("content_hash")
+                or file_sha256(pdf_path)
+            )
+
+            vector_index, keyword_index = load_document_indexes(
+                pdf_path,
+                content_hash
+            )
+
+        except Exception as error:
+            print("Skipping document index:", document["_id"], error)
+            continue
+
+        loaded.append((document, vector_index, keyword_index))
+
+    return loaded
+
+
+def ingest_document(stored_filename, content_hash):
+    """
+    Extract the full text into the cache and build the retrieval
+    indexes, so later chat turns and generators start warm. Runs as a
+    background job after upload; anything it skips is built on first use.
+    """
+
+    pdf_path = pdf_path_for(stored_filename)
+
+    _, page_count = get_pdf_text(pdf_path, content_hash)
+
+    load_document_indexes(pdf_path, content_hash)
+
+    return {
+        "page_count": page_count
+    }
@@ -0,0 +1,244 @@
+"""
+Rolling conversation memory for the chatbot.
+
+Handles:
+- a compact running summary stored on chat_conversations
+- the verbatim tail of messages not yet folded into it
+- refreshing the summary every few turns, off the request path
+
+A prompt carries the summary plus every message it does not cover
+yet. A refresh is queued as soon as that tail outgrows the last
+RECENT_TURNS turns, so the prompt normally holds those turns and the
+new message, and its size stays roughly constant however long the
+conversation runs. No message is left out before the summary covers
+it, unless refreshes keep failing and the tail passes
+REFRESH_THRESHOLD messages.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import ObjectId
+
+from planora_app.extensions import get_db
+from planora_app.ai.gemini import generate_response
+from planora_app.utils import QuotaExceeded
+
+
+# Turns (a user message plus its answer) always sent verbatim; older
+# ones are folded into the summary.
+RECENT_TURNS = int(os.getenv("CHAT_RECENT_TURNS", 3))
+
+# Extra unsummarized turns sent while refreshes lag behind or fail;
+# past them the oldest messages are dropped.
+SUMMARY_REFRESH_TURNS = int(os.getenv("CHAT_SUMMARY_REFRESH_TURNS", 3))
+
+SUMMARY_MAX_WORDS = 150
+
+# Hard cap in case the model ignores the word limit.
+SUMMARY_MAX_CHARS = 1500
+
+# Most messages read for one refresh; conversations from before the
+# summary existed only ever sent their last 10 messages anyway.
+SUMMARY_SOURCE_LIMIT = 40
+
+RECENT_MESSAGES = 2 * RECENT_TURNS
+
+REFRESH_THRESHOLD = RECENT_MESSAGES + 2 * SUMMARY_REFRESH_TURNS
+
+SUMMARY_PROMPT = """
+Update the running summary of a study conversation between a student
+and Planora Study Assistant.
+
+Keep the subjects discussed, facts and preferences the student gave,
+conclusions reached and questions still open. Drop greetings and
+repetition. Write plain text, at most {max_words} words.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_refreshing = set()
+
+
+def history_line(message):
+    """
+    One "sender: message" line; tool replies are named, since their
+    message text is empty.
+    """
+
+    if message.get("message_type", "text") != "text":
+        return (
+            f"{message['sender']}: "
+            f"[{message['message_type']}: {message.get('tool_title') or ''}]"
+        )
+
+    return f"{message['sender']}: {message['message']}"
+
+
+def _unsummarized_filter(conversation_id, conversation):
+
+    query = {"conversation_id": conversation_id}
+
+    if conversation.get("summary_until") is not None:
+        query["created_at"] = {"$gt": conversation["summary_until"]}
+
+    return query
+
+
+def get_conversation_memory(conversation_id):
+    """
+    Return (summary, history_lines) for a prompt: the running summary
+    ("" when there is none yet) and the messages it does not cover,
+    oldest first, at most REFRESH_THRESHOLD of them. Schedules a
+    summary refresh once there are more than RECENT_MESSAGES.
+    """
+
+    db = get_db()
+
+    conversation = db.chat_conversations.find_one(
+        {"_id": ObjectId(conversation_id)},
+        {"summary": 1, "summary_until": 1, "user_id": 1}
+    ) or {}
+
+    messages = list(
+        db.chat_messages.find(
+            _unsummarized_filter(conversation_id, conversation)
+        )
+        .sort("created_at", -1)
+        .limit(REFRESH_THRESHOLD)
+    )
+
+    messages.reverse()
+
+    if len(messages) > RECENT_MESSAGES:
+        schedule_summary_refresh(conversation_id, conversation.get("user_id"))
+
+    return (
+        conversation.get("summary", ""),
+        [history_line(message) for message in messages]
+    )
+
+
+def refresh_conversation_summary(conversation_id, user_id=None):
+    """
+    Fold every unsummarized message except the recent window into the
+    stored summary. Returns True when the summary was updated.
+    """
+
+    db = get_db()
+
+    conversation = db.chat_conversations.find_one(
+        {"_id": ObjectId(conversation_id)},
+        {"summary": 1, "summary_until": 1}
+    )
+
+    if not conversation:
+        return False
+
+    messages = list(
+        db.chat_messages.find(
+            _unsummarized_filter(conversation_id, conversation)
+        )
+        .sort("created_at", -1)
+        .limit(SUMMARY_SOURCE_LIMIT + RECENT_MESSAGES)
+    )
+
+    messages.reverse()
+
+    to_fold = messages[:-RECENT_MESSAGES] if RECENT_MESSAGES else messages
+
+    if not to_fold:
+        return False
+
+    prompt = SUMMARY_PROMPT.format(
+        max_words=SUMMARY_MAX_WORDS,
+        summary=conversation.get("summary") or "(none yet)",
+        messages="\n".join(history_line(message) for message in to_fold)
+    )
+
+    try:
+        summary = generate_response(
+            prompt,
+            use_cache=False,
+            user_id=user_id
+        ).strip()[:SUMMARY_MAX_CHARS]
+
+    except QuotaExceeded:
+        return False
+
+    if not summary:
+        return False
+
+    # Only apply if no other worker moved the summary on meanwhile.
+    result = db.chat_conversations.update_one(
+        {
+            "_id": conversation["_id"],
+            "summary_until": conversation.get("summary_until")
+        },
+        {
+            "$set": {
+                "summary": summary,
+                "summary_until": to_fold[-1]["created_at"]
+            }
+        }
+    )
+
+    return result.modified_count == 1
+
+
+def _get_executor():
+
+    global _executor, _executor_pid
+
+    with _executor_lock:
+
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="planora-memory"
+            )
+            _executor_pid = os.getpid()
+            _refreshing.clear()
+
+        return _executor
+
+
+def _run_refresh(conversation_id, user_id):
+
+    try:
+        refresh_conversation_summary(conversation_id, user_id)
+
+    except Exception as error:
+        print("Conversation summary refresh failed:", error)
+
+    finally:
+        with _executor_lock:
+            _refreshing.discard(conversation_id)
+
+
+def schedule_summary_refresh(conversation_id, user_id=None):
+    """
+    Queue a refresh unless one is already pending for this conversation.
+    The current turn is answered from the unsummarized tail meanwhile.
+    """
+
+    executor = _get_executor()
+
+    with _executor_lock:
+
+        if conversation_id in _refreshing:
+            return
+
+        _refreshing.add(conversation_id)
+
+    executor.submit(_run_refresh, conversation_id, user_id)
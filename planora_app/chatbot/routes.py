@@ -1,13 +1,16 @@
 # planora_app/chatbot/routes.py
 
+import json
+
 from flask import Blueprint, render_template, request, jsonify, session
-from flask import request, jsonify
+from flask import Response, stream_with_context
 from planora_app.chatbot.services import (
     create_conversation,
     get_user_conversations,
     get_messages,
     save_message,
     get_gemini_reply,
+    stream_gemini_reply,
     update_conversation_title,
     delete_conversation,
     toggle_pin,
@@ -20,12 +23,22 @@ from planora_app.chatbot.services import (
 from planora_app.ai.pdf_utils import (
     allowed_file,
     save_pdf,
-    extract_pdf_text,
-    MAX_FILE_SIZE
+    inspect_pdf,
+    InvalidPDF
     )
+from planora_app.chatbot.document_services import (
+    retain_pdf_blob,
+    release_pdf_blob
+)
+from planora_app.jobs.services import submit_job, JobQueueFull
 
 from bson import ObjectId
 from planora_app.extensions import get_db
+from planora_app.utils import QuotaExceeded
+from planora_app.ai.resilience import gemini_caller
+from planora_app.ai.response_cache import get_response_cache
+from planora_app.ai.intents import intent_classifier
+from planora_app.ai.answer_cache import answer_cache
 
 chatbot_bp = Blueprint("chatbot",__name__)
 
@@ -67,23 +80,37 @@ def test_message():
 
     return jsonify({"success": True})
     
-@chatbot_bp.route("/chatbot/send", methods=["POST"])
-def send_message():
+BUSY_MESSAGE = (
+    "⚠️ Planora is currently experiencing high AI traffic.\n\n"
+    "Please try again in a few moments."
+)
 
-    data = request.get_json()
+QUOTA_MESSAGE = (
+    "⚠️ You have used today's AI allowance.\n\n"
+    "It resets at midnight UTC."
+)
+
+
+def _begin_turn(data):
+    """
+    Validate a chat turn and store the user's message.
+    Returns (conversation, message, error_response).
+    """
+
+    data = data or {}
 
     conversation_id = data.get("conversation_id")
     message = data.get("message", "").strip()
 
     if not conversation_id or not message:
-        return jsonify({
+        return None, None, (jsonify({
             "error": "Missing data"
-        }), 400
+        }), 400)
 
     if not ObjectId.is_valid(conversation_id):
-        return jsonify({
+        return None, None, (jsonify({
             "error": "Invalid conversation ID format"
-        }), 400
+        }), 400)
 
     db = get_db()
 
@@ -92,58 +119,197 @@ def send_message():
     })
 
     if not conversation:
-        return jsonify({
+        return None, None, (jsonify({
             "error": "Conversation not found"
-        }), 404
+        }), 404)
 
     save_message(conversation_id, "user", message)
 
     if conversation.get("title") == "New Chat":
         update_conversation_title(conversation_id, message)
 
-    try:
+    return conversation, message, None
 
-        reply = get_gemini_reply(
+
+def _save_reply(conversation_id, reply):
+
+    if reply["type"] == "text":
+
+        save_message(
             conversation_id,
-            message
+            "assistant",
+            reply["content"]
         )
 
-    except Exception as error:
-        # print(error)
+    elif reply["type"] == "flashcards":
+
+        save_message(conversation_id,"assistant","",message_type="flashcards",tool_id=reply["content"]["id"],tool_title=reply["content"]["title"])
+
+    elif reply["type"] == "mindmap":
+
+        save_message(conversation_id,"assistant","",message_type="mindmap",tool_id=reply["content"]["id"],tool_title=reply["content"]["title"])
+
+
+def _sse(event, payload):
+
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@chatbot_bp.route("/chatbot/send", methods=["POST"])
+def send_message():
 
-        busy_message = (
-            "⚠️ Planora is currently experiencing high AI traffic.\n\n"
-            "Please try again in a few moments."
+    conversation, message, error = _begin_turn(request.get_json())
+
+    if error:
+        return error
+
+    conversation_id = str(conversation["_id"])
+
+    try:
+
+        reply = get_gemini_reply(
+            conversation_id,
+            message,
+            user_id=conversation.get("user_id")
         )
 
+    except QuotaExceeded:
+
         save_message(
             conversation_id,
             "assistant",
-            busy_message
+            QUOTA_MESSAGE
         )
 
         return jsonify({
 
             "type": "text",
 
-            "content": busy_message
+            "content": QUOTA_MESSAGE
 
         })
 
-    if reply["type"] == "text":
+    except Exception as error:
+
+        # print(error)
 
         save_message(
             conversation_id,
             "assistant",
-            reply["content"]
+            BUSY_MESSAGE
         )
 
-    elif reply["type"] == "flashcards":
+        return jsonify({
 
-        save_message(conversation_id,"assistant","",message_type="flashcards",tool_id=reply["content"]["id"],tool_title=reply["content"]["title"])
+            "type": "text",
+
+            "content": BUSY_MESSAGE
+
+        })
+
+    _save_reply(conversation_id, reply)
 
     return jsonify(reply)
-    
+
+
+@chatbot_bp.route("/chatbot/send-stream", methods=["POST"])
+def send_message_stream():
+    """
+    Server-Sent Events variant of /chatbot/send.
+
+    Emits "chunk" events while Gemini generates, then one "done" event
+    with the full reply. Tool replies arrive as a single "done" event.
+    The assistant message is stored once the stream completes.
+    """
+
+    conversation, message, error = _begin_turn(request.get_json())
+
+    if error:
+        return error
+
+    conversation_id = str(conversation["_id"])
+
+    def events():
+
+        parts = []
+        sources = []
+
+        try:
+
+            for reply in stream_gemini_reply(
+                conversation_id,
+                message,
+                user_id=conversation.get("user_id")
+            ):
+
+                if reply["type"] == "sources":
+                    sources = reply["content"]
+                    continue
+
+                if reply["type"] != "chunk":
+                    _save_reply(conversation_id, reply)
+                    yield _sse("done", reply)
+                    return
+
+                parts.append(reply["content"])
+                yield _sse("chunk", reply)
+
+        except Exception as error:
+
+            fallback = (
+                QUOTA_MESSAGE
+                if isinstance(error, QuotaExceeded)
+                else BUSY_MESSAGE
+            )
+
+            save_message(
+                conversation_id,
+                "assistant",
+                fallback
+            )
+
+            yield _sse("error", {
+                "type": "text",
+                "content": fallback
+            })
+            return
+
+        reply = {
+            "type": "text",
+            "content": "".join(parts),
+            "sources": sources
+        }
+
+        _save_reply(conversation_id, reply)
+
+        yield _sse("done", reply)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@chatbot_bp.route("/chatbot/ai-status")
+def ai_status():
+    """
+    Gemini call metrics for this worker process: limiter, breaker,
+    response cache, intent and answer cache counters.
+    """
+
+    cache = get_response_cache()
+
+    return jsonify({
+        "gemini": gemini_caller.stats(),
+        "response_cache": cache.stats() if cache is not None else None,
+        "intents": intent_classifier.counts(),
+        "answer_cache": answer_cache.stats() if answer_cache is not None else None
+    })
+
+
 @chatbot_bp.route("/chatbot/delete/<conversation_id>",methods=["DELETE"])
 def delete_chat(conversation_id):
     delete_conversation(conversation_id)
@@ -177,19 +343,22 @@ def upload_pdf():
     if not allowed_file(file.filename):
         return jsonify({"error": "Only PDF files are allowed"}), 400
 
-    file.seek(0, 2)
-    file_size = file.tell()
-    file.seek(0)
+    try:
+        stored_filename, pdf_path, content_hash, file_size = save_pdf(
+            file,
+            retain_pdf_blob
+        )
 
-    if file_size > MAX_FILE_SIZE:
-        return jsonify({"error": "Maximum file size is 10 MB"}), 400
+    except InvalidPDF as e:
+        return jsonify({
+            "error": str(e)
+        }), 400
 
-    stored_filename, pdf_path = save_pdf(file)
-    
     try:
-        _, page_count = extract_pdf_text(pdf_path)
+        page_count = inspect_pdf(pdf_path)
 
-    except Exception as e:
+    except InvalidPDF as e:
+        release_pdf_blob(content_hash)
         return jsonify({
             "error": str(e)
         }), 400
@@ -200,7 +369,19 @@ def upload_pdf():
         original_filename=file.filename,
         stored_filename=stored_filename,
         page_count=page_count,
-        file_size=file_size)
+        file_size=file_size,
+        content_hash=content_hash)
+
+    # Text extraction and indexing happen off the request; if the queue
+    # is full they run on the first chat turn instead.
+    try:
+        submit_job("ingest", {
+            "stored_filename": stored_filename,
+            "content_hash": content_hash
+        }, user_id)
+
+    except JobQueueFull:
+        pass
 
     return jsonify({
         "success": True,
@@ -2,18 +2,51 @@ from datetime import datetime, UTC
 from bson import ObjectId
 
 from planora_app.extensions import get_db
+from planora_app.indexes import register_index, register_hot_query
 import os
 from planora_app.ai.prompts import SYSTEM_PROMPT
 
 import os
-from planora_app.ai.pdf_utils import extract_pdf_text
-from planora_app.ai.chunking import chunk_text
-from planora_app.ai.gemini import generate_response
+from planora_app.ai.pdf_utils import pdf_path_for
+from planora_app.ai.embeddings import retrieve_across_documents
+from planora_app.ai.packing import pack_chat_prompt
+from planora_app.ai.gemini import (
+    MODEL_NAME,
+    generate_response,
+    generate_response_stream
+)
+from planora_app.ai.intents import intent_classifier, OFF_TOPIC_REPLY
 from planora_app.flashcards.services import generate_flashcards
+from planora_app.mindmap.services import generate_mindmap
+from planora_app.studypack.services import get_document_summary
+from planora_app.chatbot.memory import get_conversation_memory
+from planora_app.ai.answer_cache import answer_cache, answer_scope
+from planora_app.chatbot.document_services import (
+    conversation_content_hashes,
+    load_conversation_indexes,
+    release_pdf_blob
+)
 
 from dotenv import load_dotenv
 load_dotenv()
 
+register_index(
+    "chat_conversations",
+    [("user_id", 1), ("is_pinned", -1), ("updated_at", -1)]
+)
+register_index("chat_messages", [("conversation_id", 1), ("created_at", 1)])
+
+register_hot_query(
+    "conversation list", "chat_conversations",
+    {"user_id": "user"},
+    [("is_pinned", -1), ("updated_at", -1)]
+)
+register_hot_query(
+    "conversation messages", "chat_messages",
+    {"conversation_id": "conversation"},
+    [("created_at", 1)]
+)
+
 def create_conversation(user_id: str, title: str = "New Chat"):
     db = get_db()
 
@@ -77,6 +110,32 @@ def save_message(
 
     })
 
+def save_study_pack_messages(conversation_id, pack):
+    """
+    Post the generated parts into the chat: the summary as text, the
+    flashcards and mindmap as tool messages.
+    """
+
+    if pack["summary"]:
+        save_message(
+            conversation_id,
+            "assistant",
+            pack["summary"]["summary"]
+        )
+
+    for message_type in ("flashcards", "mindmap"):
+
+        if pack[message_type]:
+            save_message(
+                conversation_id,
+                "assistant",
+                "",
+                message_type=message_type,
+                tool_id=pack[message_type]["id"],
+                tool_title=pack[message_type]["title"]
+            )
+
+
 def get_messages(conversation_id: str):
     db = get_db()
     messages = list(
@@ -104,77 +163,271 @@ def get_active_document(conversation_id):
         "is_active": True})
 
 
-def get_gemini_reply(conversation_id, user_message):
-    db = get_db()
-    history = list(
-        db.chat_messages.find({
-            "conversation_id": conversation_id
-        })
-        .sort("created_at", -1)
-        .limit(10) )
-
-    history.reverse()
-    conversation_history = ""
-    for message in history:
-        conversation_history += (
-            f"{message['sender']}: "
-            f"{message['message']}\n"
-        )
+def prepare_gemini_reply(conversation_id, user_message):
+    """
+    Build the prompt for a chat turn.
+
+    Returns (reply, packed, cache_scope). reply is a finished response
+    when the turn is answered without a text generation (tool calls,
+    missing source, cached answer), otherwise None and packed is the
+    PackedPrompt to send to Gemini. cache_scope is where the answer may
+    be cached, or None.
+    """
+    summary, conversation_history = get_conversation_memory(conversation_id)
 
     active_document = get_active_document(conversation_id)
-    
-    lower_message = user_message.lower()
 
-    if ("flashcard" in lower_message or "flashcards" in lower_message):
+    intent = intent_classifier.classify(user_message)
 
-        if not active_document:
-            return {
-                "type": "text",
-                "content": "Please select a study source first."
-            }
+    if intent == "off_topic":
+        return {
+            "type": "text",
+            "content": OFF_TOPIC_REPLY
+        }, None, None
+
+    if intent in ("flashcards", "mindmap") and not active_document:
+        return {
+            "type": "text",
+            "content": "Please select a study source first."
+        }, None, None
+
+    if intent == "flashcards":
 
         flashcard_set = generate_flashcards(
             str(active_document["_id"]),
             10
         )
 
+        if not flashcard_set:
+            return {
+                "type": "text",
+                "content": "Unable to generate flashcards."
+            }, None, None
+
         return {
             "type": "flashcards",
             "content": flashcard_set
-        }
-    
-    pdf_context = ""
+        }, None, None
 
-    if active_document:
+    if intent == "mindmap":
+
+        mindmap = generate_mindmap(str(active_document["_id"]))
+
+        if mindmap is None:
+            return {
+                "type": "text",
+                "content": "Unable to generate mindmap."
+            }, None, None
+
+        return {
+            "type": "mindmap",
+            "content": mindmap
+        }, None, None
+
+    # Summaries stored by the study pack are served as they are; without
+    # one the request is answered from retrieval like any question.
+    if intent == "summary" and active_document:
+
+        stored = get_document_summary(str(active_document["_id"]))
+
+        if stored:
+            return {
+                "type": "text",
+                "content": stored["summary"],
+                "sources": [active_document["original_filename"]]
+            }, None, None
+
+    cache_scope = answer_cache_scope(
+        conversation_id,
+        summary,
+        conversation_history
+    )
+
+    cached = lookup_cached_answer(cache_scope, user_message)
+
+    if cached is not None:
+        return cached, None, None
+
+    study_chunks, chunk_sources = retrieve_conversation_chunks(
+        conversation_id,
+        user_message
+    )
+
+    packed = pack_chat_prompt(
+        SYSTEM_PROMPT,
+        user_message,
+        conversation_history,
+        study_chunks,
+        MODEL_NAME,
+        summary=summary,
+        chunk_sources=chunk_sources
+    )
+
+    return None, packed, cache_scope
+
+
+def answer_cache_scope(conversation_id, summary, history):
+    """
+    Cache scope for this turn, or None when its answer must not be
+    cached. Only a conversation's opening question qualifies: later
+    answers are generated from history and summary, which belong to
+    that conversation alone. history already holds the question.
+    """
+
+    if answer_cache is None:
+        return None
+
+    if summary or len(history) > 1:
+        return None
+
+    hashes = conversation_content_hashes(conversation_id)
+
+    if not hashes:
+        return None
+
+    return answer_scope(hashes)
+
+
+def lookup_cached_answer(cache_scope, user_message):
+    """
+    Answer a question from the semantic cache when a near-identical one
+    was asked about the same documents. Returns a reply marked
+    "cached", or None.
+    """
+
+    if cache_scope is None:
+        return None
+
+    entry = answer_cache.lookup(cache_scope, user_message)
+
+    if entry is None:
+        return None
+
+    return {
+        "type": "text",
+        "content": entry["answer"],
+        "sources": entry.get("sources", []),
+        "cached": True
+    }
+
+
+def remember_answer(cache_scope, conversation_id, user_message, answer, sources):
+
+    if cache_scope is None:
+        return
+
+    answer_cache.store(
+        cache_scope,
+        conversation_content_hashes(conversation_id) or [],
+        user_message,
+        answer,
+        sources
+    )
 
-        pdf_path = os.path.join(
-            "planora_app",
-            "static",
-            "uploads",
-            "pdfs",
-            active_document["stored_filename"]
-        )
+
+def retrieve_conversation_chunks(conversation_id, user_message):
+    """
+    Best chunks for a question across every document in the
+    conversation. Returns (chunks, sources): chunk texts labelled with
+    their file name, and the file name of each.
+    """
 
     try:
-        text, _ = extract_pdf_text(pdf_path)
-        chunks = chunk_text(text)
-        pdf_context = "\n\n".join(chunks[:3])
-
-    except Exception:
-        pdf_context = ""
-
-    prompt = f"""
-        {SYSTEM_PROMPT}
-        Study Material:{pdf_context}
-        Conversation:{conversation_history}
-        Current Question:{user_message}
-        Answer: """
-        
-    response = generate_response(prompt)
+        loaded = load_conversation_indexes(conversation_id)
+
+        results = retrieve_across_documents(
+            [
+                (str(document["_id"]), vector_index, keyword_index)
+                for document, vector_index, keyword_index in loaded
+            ],
+            user_message
+        )
+
+    except Exception as error:
+        print("Retrieval failed:", error)
+        return [], []
+
+    filenames = {
+        str(document["_id"]): document["original_filename"]
+        for document, _, _ in loaded
+    }
+
+    chunks = [
+        f"[Source: {filenames[document_id]}]\n{text}"
+        for document_id, text in results
+    ]
+
+    sources = [
+        filenames[document_id]
+        for document_id, _ in results
+    ]
+
+    return chunks, sources
+
+
+def get_gemini_reply(conversation_id, user_message, user_id=None):
+    reply, packed, cache_scope = prepare_gemini_reply(
+        conversation_id,
+        user_message
+    )
+
+    if reply is not None:
+        return reply
+
+    response = generate_response(packed.text, user_id=user_id)
+
+    remember_answer(
+        cache_scope,
+        conversation_id,
+        user_message,
+        response,
+        packed.sources
+    )
 
     return {
         "type": "text",
-        "content": response
+        "content": response,
+        "sources": packed.sources
+    }
+
+
+def stream_gemini_reply(conversation_id, user_message, user_id=None):
+    """
+    Streaming variant of get_gemini_reply. Yields {"type": "chunk"}
+    pieces for text answers, then one {"type": "sources"} item naming
+    the documents used, or one finished reply for tool responses.
+    """
+    reply, packed, cache_scope = prepare_gemini_reply(
+        conversation_id,
+        user_message
+    )
+
+    if reply is not None:
+        yield reply
+        return
+
+    parts = []
+
+    for text in generate_response_stream(packed.text, user_id=user_id):
+
+        parts.append(text)
+
+        yield {
+            "type": "chunk",
+            "content": text
+        }
+
+    remember_answer(
+        cache_scope,
+        conversation_id,
+        user_message,
+        "".join(parts),
+        packed.sources
+    )
+
+    yield {
+        "type": "sources",
+        "content": packed.sources
     }
 
         
@@ -203,6 +456,17 @@ def delete_conversation(conversation_id: str):
         "conversation_id": conversation_id
     })
 
+    documents = db.chat_documents.find({
+        "conversation_id": conversation_id
+    })
+
+    for document in documents:
+        release_document_file(document)
+
+    db.chat_documents.delete_many({
+        "conversation_id": conversation_id
+    })
+
 
 def toggle_pin(conversation_id: str):
     db = get_db()
@@ -232,17 +496,20 @@ def toggle_pin(conversation_id: str):
 from datetime import datetime, UTC
 
 
-def save_chat_document(user_id,conversation_id,original_filename,stored_filename,page_count,file_size):
+def save_chat_document(user_id,conversation_id,original_filename,stored_filename,page_count,file_size,content_hash):
+    """
+    The new document takes over the blob reference save_pdf took.
+    """
     db = get_db()
 
     existing_document = db.chat_documents.find_one({
     "conversation_id": conversation_id,
-    "original_filename": original_filename,
-    "file_size": file_size})
+    "content_hash": content_hash})
 
     if existing_document:
+        release_pdf_blob(content_hash)
         return str(existing_document["_id"])
-    
+
     existing_active = db.chat_documents.find_one({
         "conversation_id": conversation_id,
         "is_active": True
@@ -260,6 +527,7 @@ def save_chat_document(user_id,conversation_id,original_filename,stored_filename
         "stored_filename": stored_filename,
         "page_count": page_count,
         "file_size": file_size,
+        "content_hash": content_hash,
         "is_active": is_active,
         "created_at": datetime.now(UTC)
     })
@@ -312,6 +580,18 @@ def set_active_document(conversation_id, document_id):
 
     return True
 
+def release_document_file(document):
+
+    if document.get("content_hash"):
+        release_pdf_blob(document["content_hash"])
+        return
+
+    # Uploads from before content addressing own their file.
+    pdf_path = pdf_path_for(document["stored_filename"])
+
+    if os.path.exists(pdf_path):
+        os.remove(pdf_path)
+
 def delete_chat_document(document_id):
     db = get_db()
 
@@ -322,16 +602,7 @@ def delete_chat_document(document_id):
     if not document:
         return
 
-    pdf_path = os.path.join(
-        "planora_app",
-        "static",
-        "uploads",
-        "pdfs",
-        document["stored_filename"]
-    )
-
-    if os.path.exists(pdf_path):
-        os.remove(pdf_path)
+    release_document_file(document)
 
     conversation_id = document["conversation_id"]
 
@@ -4,6 +4,7 @@ from collections import Counter
 import platform
 from bson import ObjectId
 from planora_app.extensions import get_db
+from planora_app.pomodoro.streak_services import get_streak
 
 import pytz
 IST = pytz.timezone("Asia/Kolkata")
@@ -340,24 +341,15 @@ def get_priority_focus(user_id: str) -> dict:
 
 def get_daily_streak(user_id: str):
     """
-    Lazy Daily Streak Update.
+    Daily Streak card.
 
-    Updates streak only when:
-    - dashboard is opened
-    - today's streak has not already been updated
-    - user has at least one Completed or Partially Completed session today
-
-    Afterwards only returns stored values.
+    Reads the streak state that TimerService.save_session keeps on the
+    user document; a Completed or Partially Completed session counts
+    as a study day.
     """
 
-    db = get_db()
-
     try:
-        user = db.users.find_one(
-            {
-                "_id": ObjectId(user_id)
-            }
-        )
+        streak = get_streak(user_id)
 
     except Exception:
 
@@ -367,7 +359,7 @@ def get_daily_streak(user_id: str):
             "message": "Invalid user"
         }
 
-    if not user:
+    if streak is None:
 
         return {
             "current_streak": 0,
@@ -375,38 +367,11 @@ def get_daily_streak(user_id: str):
             "message": "User not found"
         }
 
-    current_streak = user.get("current_streak", 0)
-    highest_streak = user.get("highest_streak", 0)
-    last_update = user.get("last_streak_update")
-
-    today = datetime.now(IST).date()
-    today_str = today.strftime("%Y-%m-%d")
-
-    # Already updated today
-    if last_update == today_str:
-
-        return {
-            "current_streak": current_streak,
-            "highest_streak": highest_streak,
-            "message": f"🔥 {current_streak} day streak!"
-        }
-
-    # Check if user studied today
-    session = db.sessions.find_one(
-        {
-            "user_id": user_id,
-            "date": today_str,
-            "completion_status": {
-                "$in": [
-                    "Completed",
-                    "Partially Completed"
-                ]
-            }
-        }
-    )
+    current_streak = streak["current"]
+    highest_streak = streak["longest"]
 
     # No qualifying session today
-    if not session:
+    if not streak["studied_today"]:
 
         return {
             "current_streak": current_streak,
@@ -414,38 +379,6 @@ def get_daily_streak(user_id: str):
             "message": "Complete a study session today!"
         }
 
-    yesterday = (today - timedelta(days=1)).strftime("%Y-%m-%d")
-
-    if last_update == yesterday:
-
-        current_streak += 1
-
-    else:
-
-        current_streak = 1
-
-    if current_streak > highest_streak:
-
-        highest_streak = current_streak
-
-    db.users.update_one(
-
-        {
-            "_id": ObjectId(user_id)
-        },
-
-        {
-            "$set": {
-
-                "current_streak": current_streak,
-                "highest_streak": highest_streak,
-                "last_streak_update": today_str
-
-            }
-        }
-
-    )
-
     return {
 
         "current_streak": current_streak,
@@ -1,14 +1,200 @@
-from pymongo import MongoClient
-from config import MONGO_URI, DB_NAME
+import os
+import threading
+
+from pymongo import MongoClient, monitoring
+from config import (
+    MONGO_URI,
+    DB_NAME,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_COMPRESSORS,
+)
+
+# Upper bounds in ms for the checkout wait histogram.
+CHECKOUT_WAIT_BUCKETS_MS = (1, 5, 25, 100, 500, 2000)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool counters for this worker process, most importantly
+    how long requests wait to check out a connection. Long waits mean
+    MONGO_MAX_POOL_SIZE is too small for the worker's threads.
+    """
+
+    def __init__(self):
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+
+        with self._lock:
+            self.checkouts = 0
+            self.failed_checkouts = 0
+            self.waiting = 0
+            self.wait_total_ms = 0.0
+            self.wait_max_ms = 0.0
+            self.wait_buckets = [0] * (len(CHECKOUT_WAIT_BUCKETS_MS) + 1)
+            self.connections_open = 0
+            self.connections_in_use = 0
+            self.pool_clears = 0
+
+    def _record_wait(self, duration):
+
+        wait_ms = (duration or 0.0) * 1000
+
+        self.wait_total_ms += wait_ms
+        self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+
+        bucket = sum(
+            1 for bound in CHECKOUT_WAIT_BUCKETS_MS
+            if wait_ms > bound
+        )
+        self.wait_buckets[bucket] += 1
+
+    def connection_check_out_started(self, event):
+
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event):
+
+        with self._lock:
+            self.waiting -= 1
+            self.checkouts += 1
+            self.connections_in_use += 1
+            self._record_wait(event.duration)
+
+    def connection_check_out_failed(self, event):
+
+        with self._lock:
+            self.waiting -= 1
+            self.failed_checkouts += 1
+            self._record_wait(event.duration)
+
+    def connection_checked_in(self, event):
+
+        with self._lock:
+            self.connections_in_use -= 1
+
+    def connection_created(self, event):
+
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_closed(self, event):
+
+        with self._lock:
+            self.connections_open -= 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def snapshot(self):
+
+        with self._lock:
+
+            labels = [f"<={bound}ms" for bound in CHECKOUT_WAIT_BUCKETS_MS]
+            labels.append(f">{CHECKOUT_WAIT_BUCKETS_MS[-1]}ms")
+
+            return {
+                "max_pool_size": MONGO_MAX_POOL_SIZE,
+                "connections_open": self.connections_open,
+                "connections_in_use": self.connections_in_use,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "failed_checkouts": self.failed_checkouts,
+                "wait_avg_ms": round(
+                    self.wait_total_ms / max(self.checkouts + self.failed_checkouts, 1),
+                    3
+                ),
+                "wait_max_ms": round(self.wait_max_ms, 3),
+                "wait_histogram": dict(zip(labels, self.wait_buckets)),
+                "pool_clears": self.pool_clears
+            }
+
+
+pool_metrics = PoolMetrics()
 
 _client = None
 _db = None
+_client_lock = threading.Lock()
+
+
+def _create_client():
+
+    return MongoClient(
+        MONGO_URI,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        compressors=MONGO_COMPRESSORS,
+        event_listeners=[pool_metrics],
+    )
+
 
 def get_db():
+
     global _client, _db
+
     if _db is None:
-        _client = MongoClient(MONGO_URI)
-        _db = _client[DB_NAME]
+
+        with _client_lock:
+
+            if _db is None:
+                _client = _create_client()
+                _db = _client[DB_NAME]
+
     return _db
 
 
+def _forget_client_after_fork():
+    """
+    A client inherited through fork (gunicorn --preload) is dropped, not
+    closed, since its sockets belong to the parent; the child opens its
+    own pool on first use. Locks are replaced in case another thread
+    held them when the process forked.
+    """
+
+    global _client, _db, _client_lock
+
+    _client = None
+    _db = None
+    _client_lock = threading.Lock()
+
+    pool_metrics.__init__()
+
+
+os.register_at_fork(after_in_child=_forget_client_after_fork)
+
+
+def get_pool_stats():
+    """
+    Pool metrics for this process, or None before the first query.
+    """
+
+    if _client is None:
+        return None
+
+    return pool_metrics.snapshot()
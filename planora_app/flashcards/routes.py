@@ -6,6 +6,7 @@ from planora_app.flashcards.services import (
     delete_flashcard_set
 )
 from planora_app.chatbot.services import save_message
+from planora_app.jobs.routes import submit_job_response
 
 flashcards_bp = Blueprint(
     "flashcards",
@@ -70,6 +71,18 @@ def generate():
 
         }), 400
 
+    if data.get("background"):
+
+        return submit_job_response("flashcards", {
+
+            "document_id": document_id,
+
+            "card_count": card_count,
+
+            "conversation_id": conversation_id
+
+        })
+
     flashcard_set = generate_flashcards(
 
         document_id,
@@ -2,12 +2,23 @@ from bson import ObjectId
 from datetime import datetime, UTC
 
 from planora_app.extensions import get_db
-from planora_app.ai.pdf_utils import extract_pdf_text
-from planora_app.ai.chunking import chunk_text
-from planora_app.ai.gemini import generate_response
+from planora_app.ai.pdf_utils import get_pdf_text, pdf_path_for
+from planora_app.ai.chunking import chunk_text, CHUNK_SIZE
+from planora_app.ai.gemini import MODEL_NAME, generate_response
+from planora_app.ai.packing import pack_document_prompt
+from planora_app.ai.utils import strip_code_fences
 import json
 
 
+FLASHCARD_FORMAT = """
+        [
+            {
+                "front":"Question",
+                "back":"Answer"
+            }
+        ]"""
+
+
 def generate_flashcards(document_id, card_count):
     if not document_id or not ObjectId.is_valid(document_id):
         return None
@@ -22,49 +33,36 @@ def generate_flashcards(document_id, card_count):
     if not document:
         return []
 
-    pdf_path = (
-        "planora_app/static/uploads/pdfs/"
-        + document["stored_filename"])
+    pdf_path = pdf_path_for(document["stored_filename"])
 
-    text, _ = extract_pdf_text(pdf_path)
-    context = "\n\n".join(chunk_text(text)[:3])
+    text, _ = get_pdf_text(
+        pdf_path,
+        document.get("content_hash"),
+        max_chars=3 * CHUNK_SIZE
+    )
+    chunks = chunk_text(text)[:3]
 
-    prompt = f"""
+    instructions = f"""
         Generate exactly {card_count} study flashcards.
         Return ONLY valid JSON.
-        Format:
-        [
-            {{
-                "front":"Question",
-                "back":"Answer"
-            }}
-        ]
+        Format:{FLASHCARD_FORMAT}
 
-        Study Material:{context}
-        """
+        Study Material:"""
+
+    packed = pack_document_prompt(instructions, chunks, MODEL_NAME)
 
     try:
 
-        response = generate_response(prompt)
+        response = generate_response(
+            packed.text,
+            user_id=document.get("user_id")
+        )
 
         # print("\n========== GEMINI RESPONSE ==========\n")
         # print(response)
         # print("\n=====================================\n")
 
-        cleaned = response.strip()
-
-        if cleaned.startswith("```json"):
-            cleaned = cleaned.replace("```json", "", 1)
-
-        if cleaned.startswith("```"):
-            cleaned = cleaned.replace("```", "", 1)
-
-        if cleaned.endswith("```"):
-            cleaned = cleaned[:-3]
-
-        cleaned = cleaned.strip()
-
-        cards = json.loads(cleaned)
+        cards = parse_flashcards(response)
 
     except Exception as error:
 
@@ -76,17 +74,40 @@ def generate_flashcards(document_id, card_count):
 
     if len(cards) == 0:
         return None
-    
+
+    return save_flashcard_set(document, cards)
+
+
+def parse_flashcards(response):
+    """
+    Parse the model's JSON card list. Raises ValueError when it is not
+    a list.
+    """
+
+    cards = json.loads(strip_code_fences(response, "json"))
+
+    if not isinstance(cards, list):
+        raise ValueError("Flashcards must be a JSON list.")
+
+    return cards
+
+
+def save_flashcard_set(document, cards):
+
+    db = get_db()
+
+    title = document["original_filename"].replace(".pdf", "")
+
     result = db.flashcards.insert_one({
-    "document_id": document_id,
-    "title": document["original_filename"].replace(".pdf", ""),
+    "document_id": str(document["_id"]),
+    "title": title,
     "card_count": len(cards),
     "cards": cards,
     "created_at": datetime.now(UTC)})
 
     return {
         "id": str(result.inserted_id),
-        "title": document["original_filename"].replace(".pdf", ""),
+        "title": title,
         "card_count": len(cards)
     }
 
@@ -0,0 +1,217 @@
+"""
+Mongo index registry.
+
+Handles:
+- indexes declared by the service module that owns each collection
+- hot queries those indexes must serve
+- applying the indexes idempotently at startup or from the CLI
+- an explain() check that fails when a hot query plans a COLLSCAN
+
+Service modules register at import time, so create_app() sees every
+index once its blueprints are imported. From the shell:
+
+    flask --app app indexes ensure
+    flask --app app indexes verify
+"""
+
+import os
+import threading
+
+import click
+from pymongo.errors import OperationFailure, PyMongoError
+
+from planora_app.extensions import get_db
+
+
+ENSURE_INDEXES_ON_STARTUP = os.getenv("MONGO_ENSURE_INDEXES", "on") != "off"
+
+_indexes = []
+_hot_queries = []
+
+
+class IndexCheckFailed(Exception):
+    pass
+
+
+def _index_name(keys):
+
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+def register_index(collection, keys, **options):
+    """
+    Declare an index. keys is a list of (field, direction) pairs;
+    options are passed to create_index (unique, sparse, ...).
+    """
+
+    options.setdefault("name", _index_name(keys))
+
+    spec = (collection, list(keys), options)
+
+    if spec not in _indexes:
+        _indexes.append(spec)
+
+
+def register_hot_query(name, collection, query, sort=None):
+    """
+    Declare a query that must be served by an index. Values in query
+    only need the right shape; the plan does not depend on them.
+    """
+
+    if any(existing[0] == name for existing in _hot_queries):
+        return
+
+    _hot_queries.append((name, collection, query, sort))
+
+
+def registered_indexes():
+
+    return list(_indexes)
+
+
+def registered_hot_queries():
+
+    return list(_hot_queries)
+
+
+def ensure_indexes(db=None):
+    """
+    Create every registered index. Indexes that already exist with the
+    same definition are left untouched. An index the server rejects
+    (e.g. a conflicting definition or duplicate keys for a unique
+    index) is reported and skipped; connection errors are raised.
+
+    Returns (created names, [(collection, name, error)] for failures).
+    """
+
+    db = db if db is not None else get_db()
+
+    created = []
+    failed = []
+
+    for collection, keys, options in _indexes:
+
+        try:
+            created.append(db[collection].create_index(keys, **options))
+
+        except OperationFailure as error:
+            print(f"❌ Could not create index {collection}.{options['name']}:", error)
+            failed.append((collection, options["name"], error))
+
+    return created, failed
+
+
+def _plan_stages(plan):
+
+    if not isinstance(plan, dict):
+        return
+
+    if "stage" in plan:
+        yield plan["stage"]
+
+    for key in ("inputStage", "queryPlan"):
+        yield from _plan_stages(plan.get(key))
+
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+def find_collection_scans(db=None):
+    """
+    Explain every hot query and return the names of those whose winning
+    plan contains a COLLSCAN.
+    """
+
+    db = db if db is not None else get_db()
+
+    scans = []
+
+    for name, collection, query, sort in _hot_queries:
+
+        cursor = db[collection].find(query)
+
+        if sort:
+            cursor = cursor.sort(sort)
+
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+
+        if "COLLSCAN" in _plan_stages(plan):
+            scans.append(name)
+
+    return scans
+
+
+def verify_hot_queries(db=None):
+
+    scans = find_collection_scans(db)
+
+    if scans:
+        raise IndexCheckFailed(
+            "Hot queries without an index: " + ", ".join(scans)
+        )
+
+
+def _ensure_indexes_quietly():
+
+    try:
+        ensure_indexes()
+
+    except PyMongoError as error:
+        print("❌ Could not ensure Mongo indexes:", error)
+
+
+def init_indexes(app):
+    """
+    Register the CLI commands and, unless MONGO_ENSURE_INDEXES=off,
+    apply the registered indexes. This runs in the background so an
+    unreachable server does not hold up startup.
+    """
+
+    app.cli.add_command(indexes_cli)
+
+    if not ENSURE_INDEXES_ON_STARTUP:
+        return
+
+    threading.Thread(
+        target=_ensure_indexes_quietly,
+        name="ensure-indexes",
+        daemon=True
+    ).start()
+
+
+@click.group("indexes")
+def indexes_cli():
+    """Manage Mongo indexes."""
+
+
+@indexes_cli.command("ensure")
+def ensure_command():
+    """Create every registered index."""
+
+    created, failed = ensure_indexes()
+
+    for name in created:
+        click.echo(f"{'ok':9} {name}")
+
+    for collection, name, error in failed:
+        click.echo(f"{'FAILED':9} {collection}.{name}: {error}")
+
+    if failed:
+        raise click.ClickException(
+            f"{len(failed)} indexes could not be created"
+        )
+
+
+@indexes_cli.command("verify")
+def verify_command():
+    """Fail when a hot query falls back to a collection scan."""
+
+    scans = find_collection_scans()
+
+    for name, *_ in _hot_queries:
+        click.echo(f"{'COLLSCAN' if name in scans else 'ok':9} {name}")
+
+    if scans:
+        raise click.ClickException(
+            f"{len(scans)} hot queries use a collection scan"
+        )
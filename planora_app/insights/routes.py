@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
-from planora_app.extensions import get_db
+from planora_app.pomodoro.rollup_services import sum_rollups, rollup_totals
+from planora_app.pomodoro.streak_services import get_streak
 from datetime import datetime, timedelta
 from collections import defaultdict
 
@@ -26,8 +27,6 @@ def hours_by_subject():
     user_id = session['user_id']  # Keep as string, not ObjectId
     filter_type = request.args.get('filter_type', 'week')  # day, week, month, all
     
-    db = get_db()
-    
     # Calculate date range based on filter
     today = datetime.now()
     
@@ -46,42 +45,13 @@ def hours_by_subject():
     else:
         start_date = (today - timedelta(days=7)).strftime("%Y-%m-%d")
     
-    # MongoDB aggregation pipeline
+    # Focus minutes from the daily rollups
     # Note: user_id is stored as STRING in your DB, not ObjectId
-    pipeline = [
-        {
-            "$match": {
-                "user_id": user_id,  # String comparison
-                "date": {"$gte": start_date},
-                "completion_status": {"$in": ["Completed", "Incomplete", "Interrupted", "completed", "incomplete", "interrupted"]}
-            }
-        },
-        {
-            "$group": {
-                "_id": "$subject",
-                "total_minutes": {
-                    "$sum": {
-                        "$multiply": [
-                            "$no_of_cycles_completed",
-                            "$timer_per_cycle"
-                        ]
-                    }
-                }
-            }
-        },
-        {
-            "$project": {
-                "subject": "$_id",
-                "total_hours": {"$divide": ["$total_minutes", 60]},
-                "_id": 0
-            }
-        },
-        {
-            "$sort": {"total_hours": -1}
-        }
+    results = [
+        {"subject": item['_id'], "total_hours": item['focus_minutes'] / 60}
+        for item in sum_rollups(user_id, start_date, group_by="subject", only="focus_sessions")
     ]
-    
-    results = list(db.sessions.aggregate(pipeline))
+    results.sort(key=lambda item: item['total_hours'], reverse=True)
     
     # Format for Chart.js
     subjects = [item['subject'] for item in results]
@@ -103,50 +73,16 @@ def progress_over_time():
         return jsonify({"error": "Unauthorized"}), 401
     
     user_id = session['user_id']  # String format
-    db = get_db()
     
     # Last 30 days
     today = datetime.now()
     start_date = (today - timedelta(days=30)).strftime("%Y-%m-%d")
     
-    # MongoDB aggregation pipeline
-    pipeline = [
-        {
-            "$match": {
-                "user_id": user_id,  # String comparison
-                "date": {"$gte": start_date},
-                "completion_status": {"$in": ["Completed", "Incomplete", "Interrupted", "completed", "incomplete", "interrupted"]}
-            }
-        },
-        {
-            "$group": {
-                "_id": "$date",
-                "total_minutes": {
-                    "$sum": {
-                        "$multiply": [
-                            "$no_of_cycles_completed",
-                            "$timer_per_cycle"
-                        ]
-                    }
-                }
-            }
-        },
-        {
-            "$project": {
-                "date": "$_id",
-                "total_hours": {"$divide": ["$total_minutes", 60]},
-                "_id": 0
-            }
-        },
-        {
-            "$sort": {"date": 1}
-        }
-    ]
-    
-    results = list(db.sessions.aggregate(pipeline))
+    # Focus minutes per day from the daily rollups
+    results = sum_rollups(user_id, start_date, group_by="date", only="focus_sessions")
     
     # Create a dictionary for easy lookup
-    hours_by_date = {item['date']: round(item['total_hours'], 2) for item in results}
+    hours_by_date = {item['_id']: round(item['focus_minutes'] / 60, 2) for item in results}
     
     # Generate all dates for last 30 days (fill missing dates with 0)
     dates = []
@@ -172,61 +108,19 @@ def get_stats():
         return jsonify({"error": "Unauthorized"}), 401
     
     user_id = session['user_id']  # String format
-    db = get_db()
-    
-    # Total study hours (all time)
-    pipeline_total = [
-        {
-            "$match": {
-                "user_id": user_id,  # String comparison
-                "completion_status": {"$in": ["Completed", "Incomplete", "Interrupted", "completed", "incomplete", "interrupted"]}
-            }
-        },
-        {
-            "$group": {
-                "_id": None,
-                "total_minutes": {
-                    "$sum": {
-                        "$multiply": [
-                            "$no_of_cycles_completed",
-                            "$timer_per_cycle"
-                        ]
-                    }
-                }
-            }
-        }
-    ]
     
-    total_result = list(db.sessions.aggregate(pipeline_total))
-    total_hours = round(total_result[0]['total_minutes'] / 60, 1) if total_result else 0
+    # Total study hours and sessions (all time) from the daily rollups
+    totals = rollup_totals(user_id, only="focus_sessions")
+    total_hours = round(totals['focus_minutes'] / 60, 1)
     
-    # Study streak calculation
-    today = datetime.now()
-    streak = 0
-    current_date = today
-    
-    for i in range(365):  # Check up to 1 year back
-        date_str = current_date.strftime("%Y-%m-%d")
-        session_exists = db.sessions.find_one({
-            "user_id": user_id,  # String comparison
-            "date": date_str,
-            "completion_status": {"$in": ["Completed", "Incomplete", "Interrupted", "completed", "incomplete", "interrupted"]}
-        })
-        
-        if session_exists:
-            streak += 1
-            current_date -= timedelta(days=1)
-        else:
-            break
-    
-    # Total sessions
-    total_sessions = db.sessions.count_documents({
-        "user_id": user_id,  # String comparison
-        "completion_status": {"$in": ["Completed", "Incomplete", "Interrupted", "completed", "incomplete", "interrupted"]}
-    })
+    # Study streak from the state kept on the user document
+    streak = get_streak(user_id)
+    study_streak = streak["current"] if streak else 0
+    
+    total_sessions = totals['focus_sessions']
     
     return jsonify({
         "total_hours": total_hours,
-        "study_streak": streak,
+        "study_streak": study_streak,
         "total_sessions": total_sessions
     })
\ No newline at end of file
@@ -0,0 +1,52 @@
+from flask import Blueprint, jsonify, session
+
+from planora_app.jobs.services import get_job, submit_job, JobQueueFull
+
+
+jobs_bp = Blueprint(
+    "jobs",
+    __name__,
+    url_prefix="/jobs"
+)
+
+
+@jobs_bp.route("/<job_id>")
+def job_status(job_id):
+
+    user_id = session.get("user_id")
+
+    if not user_id:
+        return jsonify({
+            "error": "User not logged in"
+        }), 401
+
+    job = get_job(job_id, user_id)
+
+    if job is None:
+        return jsonify({
+            "error": "Job not found"
+        }), 404
+
+    return jsonify(job)
+
+
+def submit_job_response(kind, params):
+    """
+    Submit a background job and build the 202 response for it, used by
+    the generate endpoints when called with "background": true.
+    """
+
+    try:
+        job_id = submit_job(kind, params, session.get("user_id"))
+
+    except JobQueueFull:
+
+        return jsonify({
+            "success": False,
+            "error": "Too many generations in progress. Please try again shortly."
+        }), 429
+
+    return jsonify({
+        "success": True,
+        "job_id": job_id
+    }), 202
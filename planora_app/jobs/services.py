@@ -0,0 +1,275 @@
+"""
+Background jobs for slow AI generation.
+
+Handles:
+- submitting flashcard, mindmap and study pack generation as jobs
+- ingesting uploaded PDFs (text cache and retrieval indexes)
+- a bounded worker pool per process
+- job state in the Mongo "jobs" collection
+
+The pool runs in whichever gunicorn worker accepted the submission, but
+state lives in Mongo so any worker can answer status queries.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
+
+from bson import ObjectId
+
+from planora_app.extensions import get_db
+from planora_app.flashcards.services import generate_flashcards
+from planora_app.mindmap.services import generate_mindmap
+from planora_app.studypack.services import generate_study_pack
+from planora_app.chatbot.services import save_message, save_study_pack_messages
+from planora_app.chatbot.document_services import ingest_document
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+
+# Jobs allowed to wait for a worker, per process, before submit refuses.
+JOB_QUEUE_DEPTH = int(os.getenv("JOB_QUEUE_DEPTH", 16))
+
+# Jobs that have not finished after this long are reported as failed,
+# e.g. when the worker process running them was restarted.
+JOB_TIMEOUT = timedelta(
+    seconds=int(os.getenv("JOB_TIMEOUT_SECONDS", 600))
+)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobError(Exception):
+    pass
+
+
+def _flashcards_job(params):
+
+    flashcard_set = generate_flashcards(
+        params["document_id"],
+        params.get("card_count", 10)
+    )
+
+    if not flashcard_set:
+        raise JobError("Unable to generate flashcards.")
+
+    if params.get("conversation_id"):
+        save_message(
+            params["conversation_id"],
+            "assistant",
+            "",
+            message_type="flashcards",
+            tool_id=flashcard_set["id"],
+            tool_title=flashcard_set["title"]
+        )
+
+    return flashcard_set
+
+
+def _mindmap_job(params):
+
+    mindmap = generate_mindmap(params["document_id"])
+
+    if mindmap is None:
+        raise JobError("Unable to generate mindmap.")
+
+    if params.get("conversation_id"):
+        save_message(
+            params["conversation_id"],
+            "assistant",
+            "",
+            message_type="mindmap",
+            tool_id=mindmap["id"],
+            tool_title=mindmap["title"]
+        )
+
+    return mindmap
+
+
+def _studypack_job(params):
+
+    pack = generate_study_pack(
+        params["document_id"],
+        params.get("card_count", 10)
+    )
+
+    if pack is None:
+        raise JobError("Unable to generate study pack.")
+
+    if params.get("conversation_id"):
+        save_study_pack_messages(params["conversation_id"], pack)
+
+    return pack
+
+
+def _ingest_job(params):
+
+    return ingest_document(
+        params["stored_filename"],
+        params["content_hash"]
+    )
+
+
+JOB_HANDLERS = {
+    "flashcards": _flashcards_job,
+    "mindmap": _mindmap_job,
+    "studypack": _studypack_job,
+    "ingest": _ingest_job,
+}
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_slots = None
+
+
+def _get_executor():
+    """
+    Create the pool lazily, and again after a fork, since threads are
+    not carried over into gunicorn's worker processes.
+    """
+
+    global _executor, _executor_pid, _slots
+
+    with _executor_lock:
+
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=JOB_WORKERS,
+                thread_name_prefix="planora-job"
+            )
+            _executor_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(JOB_WORKERS + JOB_QUEUE_DEPTH)
+
+        return _executor
+
+
+def submit_job(kind, params, user_id=None):
+    """
+    Queue a job and return its id without waiting for it to run.
+    Raises JobQueueFull when the worker pool and queue are saturated.
+    """
+
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type: {kind}")
+
+    executor = _get_executor()
+
+    if not _slots.acquire(blocking=False):
+        raise JobQueueFull()
+
+    db = get_db()
+
+    now = datetime.now(UTC)
+
+    try:
+        result = db.jobs.insert_one({
+            "kind": kind,
+            "params": params,
+            "user_id": user_id,
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        })
+
+        job_id = result.inserted_id
+
+        executor.submit(_run_job, job_id, kind, params)
+
+    except Exception:
+        _slots.release()
+        raise
+
+    return str(job_id)
+
+
+def _run_job(job_id, kind, params):
+
+    db = get_db()
+
+    try:
+        db.jobs.update_one(
+            {"_id": job_id},
+            {"$set": {
+                "status": "running",
+                "started_at": datetime.now(UTC),
+                "updated_at": datetime.now(UTC)
+            }}
+        )
+
+        try:
+            result = JOB_HANDLERS[kind](params)
+
+        except Exception as error:
+            db.jobs.update_one(
+                {"_id": job_id},
+                {"$set": {
+                    "status": "failed",
+                    "error": str(error),
+                    "finished_at": datetime.now(UTC),
+                    "updated_at": datetime.now(UTC)
+                }}
+            )
+            return
+
+        db.jobs.update_one(
+            {"_id": job_id},
+            {"$set": {
+                "status": "done",
+                "result": result,
+                "finished_at": datetime.now(UTC),
+                "updated_at": datetime.now(UTC)
+            }}
+        )
+
+    finally:
+        _slots.release()
+
+
+def get_job(job_id, user_id):
+    """
+    A job's status and result, or None when it does not exist or
+    belongs to another user.
+    """
+
+    if not job_id or not ObjectId.is_valid(job_id):
+        return None
+
+    db = get_db()
+
+    job = db.jobs.find_one({
+        "_id": ObjectId(job_id),
+        "user_id": user_id
+    })
+
+    if not job:
+        return None
+
+    status = job["status"]
+    error = job.get("error")
+
+    created_at = job["created_at"]
+
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=UTC)
+
+    if (
+        status in ("queued", "running")
+        and datetime.now(UTC) - created_at > JOB_TIMEOUT
+    ):
+        status = "failed"
+        error = "Job timed out."
+
+    return {
+        "id": str(job["_id"]),
+        "kind": job["kind"],
+        "status": status,
+        "result": job.get("result"),
+        "error": error
+    }
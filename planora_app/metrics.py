@@ -0,0 +1,30 @@
+"""
+Per-process counters.
+
+Handles:
+- thread-safe named counters
+- consistent snapshots for status routes
+
+Shared by the Gemini resilience layer, the intent classifier and the
+answer cache.
+"""
+
+import threading
+
+
+class Metrics:
+
+    def __init__(self):
+
+        self._lock = threading.Lock()
+        self.counters = {}
+
+    def incr(self, name, amount=1):
+
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+
+        with self._lock:
+            return dict(self.counters)
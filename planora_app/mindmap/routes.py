@@ -8,6 +8,7 @@ from planora_app.mindmap.services import (
 )
 
 from planora_app.chatbot.services import save_message
+from planora_app.jobs.routes import submit_job_response
 
 
 mindmap_bp = Blueprint(
@@ -82,6 +83,16 @@ def generate():
 
         }), 400
 
+    if data.get("background"):
+
+        return submit_job_response("mindmap", {
+
+            "document_id": document_id,
+
+            "conversation_id": conversation_id
+
+        })
+
     mindmap = generate_mindmap(
 
         document_id
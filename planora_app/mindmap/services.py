@@ -2,47 +2,14 @@ from bson import ObjectId
 from datetime import datetime, UTC
 
 from planora_app.extensions import get_db
-from planora_app.ai.pdf_utils import extract_pdf_text
-from planora_app.ai.chunking import chunk_text
-from planora_app.ai.gemini import generate_response
+from planora_app.ai.pdf_utils import get_pdf_text, pdf_path_for
+from planora_app.ai.chunking import chunk_text, CHUNK_SIZE
+from planora_app.ai.gemini import MODEL_NAME, generate_response
+from planora_app.ai.packing import pack_document_prompt
+from planora_app.ai.utils import strip_code_fences
 
 
-def generate_mindmap(document_id):
-    if not document_id or not ObjectId.is_valid(document_id):
-        return None
-    db = get_db()
-    try:
-        document = db.chat_documents.find_one({"_id": ObjectId(document_id)})
-    except Exception:
-        return None
-    if not document:
-        return None
-
-    pdf_path = ("planora_app/static/uploads/pdfs/" + document["stored_filename"])
-    text, _ = extract_pdf_text(pdf_path)
-    context = "\n\n".join(chunk_text(text)[:2])
-    
-    prompt = f"""
-You are an expert study assistant.
-
-Generate ONE study mindmap from the provided study material.
-
-IMPORTANT:
-
-Return ONLY valid Mermaid mindmap syntax.
-
-Do NOT return:
-- markdown fences
-- ```mermaid
-- explanations
-- notes
-- bullet points
-- numbered lists
-- comments
-- introductory text
-- concluding text
-
-OUTPUT RULES:
+MINDMAP_RULES = """OUTPUT RULES:
 
 1. First line MUST be:
 mindmap
@@ -87,26 +54,61 @@ mindmap
     Evaluation
       Accuracy
       Precision
-
-Study Material:
-
-{context}
 """
 
+
+def generate_mindmap(document_id):
+    if not document_id or not ObjectId.is_valid(document_id):
+        return None
+    db = get_db()
     try:
-        response = generate_response(prompt)
-        mindmap = response.strip()
-        
-        if mindmap.startswith("```mermaid"):
-            mindmap = mindmap.replace("```mermaid","",1)
+        document = db.chat_documents.find_one({"_id": ObjectId(document_id)})
+    except Exception:
+        return None
+    if not document:
+        return None
+
+    pdf_path = pdf_path_for(document["stored_filename"])
+    text, _ = get_pdf_text(
+        pdf_path,
+        document.get("content_hash"),
+        max_chars=2 * CHUNK_SIZE
+    )
+    chunks = chunk_text(text)[:2]
+
+    instructions = f"""
+You are an expert study assistant.
 
-        if mindmap.startswith("```"):
-            mindmap = mindmap.replace("```","",1)
+Generate ONE study mindmap from the provided study material.
 
-        if mindmap.endswith("```"):
-            mindmap = mindmap[:-3]
+IMPORTANT:
 
-        mindmap = mindmap.strip()
+Return ONLY valid Mermaid mindmap syntax.
+
+Do NOT return:
+- markdown fences
+- ```mermaid
+- explanations
+- notes
+- bullet points
+- numbered lists
+- comments
+- introductory text
+- concluding text
+
+{MINDMAP_RULES}
+Study Material:
+
+"""
+
+    packed = pack_document_prompt(instructions, chunks, MODEL_NAME)
+
+    try:
+        response = generate_response(
+            packed.text,
+            user_id=document.get("user_id")
+        )
+        mindmap = strip_code_fences(response, "mermaid")
 
     except Exception:
         mindmap = ""
@@ -114,15 +116,22 @@ Study Material:
     if len(mindmap) == 0:
         return None
 
+    return save_mindmap(document, mindmap)
+
+
+def save_mindmap(document, mindmap):
+    db = get_db()
+    title = document["original_filename"].replace(".pdf","")
+
     result = db.mindmaps.insert_one({
-        "document_id": document_id,
-        "title": document["original_filename"].replace(".pdf",""),
+        "document_id": str(document["_id"]),
+        "title": title,
         "mindmap": mindmap,
         "created_at": datetime.now(UTC)})
 
     return {
         "id": str(result.inserted_id),
-        "title": document["original_filename"].replace(".pdf","")}
+        "title": title}
 
 
 def get_mindmaps():
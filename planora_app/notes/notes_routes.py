@@ -146,7 +146,7 @@ def summarize_note_route(note_id):
 
     try:
         summary = asyncio.run(
-            summarize_note(note.get("text", ""))
+            summarize_note(note.get("text", ""), user_id)
         )
 
         db = get_db()
@@ -1,5 +1,7 @@
 from datetime import datetime, timezone
 from planora_app.extensions import get_db
+from planora_app.ai.gemini import generate_response
+from planora_app.utils import QuotaExceeded
 from bson import ObjectId
 
 
@@ -87,7 +89,7 @@ def _serialize_note(doc):
     return doc
 
 
-async def summarize_note(text: str) -> str:
+async def summarize_note(text: str, user_id: str = None) -> str:
     """
     Generate AI summary using Gemini.
     Returns a user-friendly message on failure.
@@ -95,40 +97,6 @@ async def summarize_note(text: str) -> str:
 
     try:
 
-        import os
-        from dotenv import load_dotenv
-        from google import genai
-
-        env_paths = [
-            os.path.join(
-                os.path.dirname(__file__),
-                "../../.env",
-            ),
-            os.path.join(
-                os.path.dirname(__file__),
-                "../env",
-            ),
-        ]
-
-        for env_path in env_paths:
-            if os.path.exists(env_path):
-                load_dotenv(dotenv_path=env_path)
-                break
-
-        api_key = (
-            os.getenv("GEMINI_API_KEY")
-            or os.getenv("GOOGLE_API_KEY")
-        )
-
-        if not api_key:
-            print("Gemini API key not configured.")
-            return (
-                "AI Summary is currently unavailable. "
-                "Please try again later."
-            )
-
-        client = genai.Client(api_key=api_key)
-
         prompt = f"""
 Please provide a concise and well-structured summary of the following study notes.
 
@@ -143,19 +111,23 @@ Notes:
 {text}
 """
 
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
-        )
+        summary = generate_response(prompt, user_id=user_id)
 
-        if hasattr(response, "text") and response.text:
-            return response.text.strip()
+        if summary:
+            return summary.strip()
 
         return (
             "AI could not generate a summary at the moment. "
             "Please try again later."
         )
 
+    except QuotaExceeded:
+
+        return (
+            "⚠️ You have used today's AI allowance. "
+            "AI Summary will be available again after midnight UTC."
+        )
+
     except Exception as e:
 
         error = str(e)
@@ -1,6 +1,16 @@
 from planora_app.extensions import get_db
 from datetime import datetime
 from bson import ObjectId
+from planora_app.indexes import register_index, register_hot_query
+
+
+register_index("notes", [("user_id", 1), ("starred", -1), ("created_at", -1)])
+
+register_hot_query(
+    "notes list", "notes",
+    {"user_id": "user"},
+    [("starred", -1), ("created_at", -1)]
+)
 
 
 def get_user_notes(user_id: str, filter_type=None, filter_value=None):
@@ -0,0 +1,230 @@
+"""
+Per-user daily session rollups.
+
+Handles:
+- one session_daily_rollups document per (user_id, date, subject)
+- $inc updates when TimerService.save_session records a session
+- rebuilding rollups from raw sessions (backfill)
+- summed reads for insights, timer stats and settings
+
+Counters on each rollup:
+- sessions, minutes, cycles, pauses: every session
+- completed_sessions, completed_minutes: status "Completed"
+- focus_sessions, focus_minutes: statuses insights counts, with
+  minutes as completed cycles times minutes per cycle
+"""
+
+import click
+from pymongo import ReplaceOne
+
+from planora_app.extensions import get_db
+from planora_app.indexes import register_index, register_hot_query
+
+
+ROLLUP_FIELDS = (
+    "sessions",
+    "minutes",
+    "cycles",
+    "pauses",
+    "completed_sessions",
+    "completed_minutes",
+    "focus_sessions",
+    "focus_minutes",
+)
+
+# Rollups written per bulk_write during a rebuild.
+REBUILD_BATCH_SIZE = 500
+
+# Statuses insights has always counted. The timer sends "Completed",
+# "Not Completed" or "Partially Completed"; older data has the rest.
+FOCUS_STATUSES = {"completed", "incomplete", "interrupted"}
+
+register_index(
+    "session_daily_rollups",
+    [("user_id", 1), ("date", 1), ("subject", 1)],
+    unique=True
+)
+
+register_hot_query(
+    "daily rollups", "session_daily_rollups",
+    {"user_id": "user", "date": {"$gte": "2026-01-01"}}
+)
+
+
+def session_counters(session):
+    """
+    Rollup increments for one session document.
+    """
+
+    status = str(session.get("completion_status", "")).lower()
+
+    completed = status == "completed"
+    focus = status in FOCUS_STATUSES
+
+    minutes = int(session.get("total_time", 0) or 0)
+    cycles = int(session.get("no_of_cycles_completed", 0) or 0)
+    cycle_minutes = int(session.get("timer_per_cycle", 0) or 0)
+
+    return {
+        "sessions": 1,
+        "minutes": minutes,
+        "cycles": cycles,
+        "pauses": int(session.get("pause_count", 0) or 0),
+        "completed_sessions": 1 if completed else 0,
+        "completed_minutes": minutes if completed else 0,
+        "focus_sessions": 1 if focus else 0,
+        "focus_minutes": cycles * cycle_minutes if focus else 0,
+    }
+
+
+def record_session(session):
+    """
+    Add a saved session to its day's rollup.
+    """
+
+    get_db().session_daily_rollups.update_one(
+        {
+            "user_id": session["user_id"],
+            "date": session["date"],
+            "subject": session["subject"]
+        },
+        {"$inc": session_counters(session)},
+        upsert=True
+    )
+
+
+def _sum_expression(field, status_check):
+
+    return {"$sum": {"$cond": [status_check, field, 0]}}
+
+
+def rebuild_rollups(user_id=None):
+    """
+    Recompute rollups from raw sessions, for every user or one.
+
+    Each rollup is replaced in place and only rollups with no sessions
+    left are deleted afterwards, so reads never see a missing day. A
+    session saved between the aggregation and the replace of its own
+    rollup can still be dropped; running it again repairs that.
+    """
+
+    db = get_db()
+
+    query = {"user_id": str(user_id)} if user_id is not None else {}
+
+    status = {"$toLower": {"$ifNull": ["$completion_status", ""]}}
+    completed = {"$eq": [status, "completed"]}
+    focus = {"$in": [status, sorted(FOCUS_STATUSES)]}
+
+    pipeline = [
+        {"$match": query},
+        {
+            "$group": {
+                "_id": {
+                    "user_id": "$user_id",
+                    "date": "$date",
+                    "subject": "$subject"
+                },
+                "sessions": {"$sum": 1},
+                "minutes": {"$sum": "$total_time"},
+                "cycles": {"$sum": "$no_of_cycles_completed"},
+                "pauses": {"$sum": "$pause_count"},
+                "completed_sessions": _sum_expression(1, completed),
+                "completed_minutes": _sum_expression("$total_time", completed),
+                "focus_sessions": _sum_expression(1, focus),
+                "focus_minutes": _sum_expression(
+                    {"$multiply": ["$no_of_cycles_completed", "$timer_per_cycle"]},
+                    focus
+                )
+            }
+        }
+    ]
+
+    rebuilt = set()
+    batch = []
+
+    for group in db.sessions.aggregate(pipeline):
+
+        key = group.pop("_id")
+        rebuilt.add((key["user_id"], key["date"], key["subject"]))
+
+        batch.append(ReplaceOne(key, {**key, **group}, upsert=True))
+
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            db.session_daily_rollups.bulk_write(batch, ordered=False)
+            batch = []
+
+    if batch:
+        db.session_daily_rollups.bulk_write(batch, ordered=False)
+
+    stale = [
+        rollup["_id"]
+        for rollup in db.session_daily_rollups.find(
+            query,
+            {"user_id": 1, "date": 1, "subject": 1}
+        )
+        if (rollup["user_id"], rollup["date"], rollup.get("subject")) not in rebuilt
+    ]
+
+    if stale:
+        db.session_daily_rollups.delete_many({"_id": {"$in": stale}})
+
+    return len(rebuilt)
+
+
+def sum_rollups(user_id, start_date=None, group_by=None, only=None, db=None):
+    """
+    Summed counters for a user's rollups, optionally from start_date
+    (YYYY-MM-DD) onward, grouped by "date" or "subject", and limited to
+    rollups where the counter named by only is non-zero. Each result has
+    the group value under "_id".
+    """
+
+    query = {"user_id": str(user_id)}
+
+    if start_date:
+        query["date"] = {"$gte": start_date}
+
+    if only:
+        query[only] = {"$gt": 0}
+
+    group = {"_id": f"${group_by}" if group_by else None}
+
+    for field in ROLLUP_FIELDS:
+        group[field] = {"$sum": f"${field}"}
+
+    db = db if db is not None else get_db()
+
+    return list(
+        db.session_daily_rollups.aggregate([
+            {"$match": query},
+            {"$group": group}
+        ])
+    )
+
+
+def rollup_totals(user_id, start_date=None, only=None, db=None):
+
+    totals = sum_rollups(user_id, start_date, only=only, db=db)
+
+    if not totals:
+        return dict.fromkeys(ROLLUP_FIELDS, 0)
+
+    totals[0].pop("_id")
+
+    return totals[0]
+
+
+@click.group("rollups")
+def rollups_cli():
+    """Manage session_daily_rollups."""
+
+
+@rollups_cli.command("backfill")
+@click.option("--user-id", default=None, help="Rebuild one user only.")
+def backfill_command(user_id):
+    """Rebuild daily rollups from the sessions collection."""
+
+    count = rebuild_rollups(user_id)
+
+    click.echo(f"{count} daily rollups written")
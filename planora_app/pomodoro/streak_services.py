@@ -0,0 +1,243 @@
+"""
+Daily study streaks.
+
+Handles:
+- the streak state machine (current, longest, last_day, total_days)
+- O(1) updates when TimerService.save_session records a qualifying
+  session, and total_days for sessions saved for an earlier day
+- reads for dashboard, insights, settings and challenges
+- rebuilding state from raw sessions (backfill)
+
+State lives on the user document under "streak". A streak is alive
+while last_day is today or yesterday (IST); reads report 0 otherwise.
+"""
+
+from datetime import datetime, timedelta
+
+import click
+import pytz
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from planora_app.extensions import get_db
+
+
+IST = pytz.timezone("Asia/Kolkata")
+
+# Sessions that count as a study day.
+STREAK_STATUSES = ("Completed", "Partially Completed")
+
+EMPTY_STREAK = {
+    "current": 0,
+    "longest": 0,
+    "last_day": None,
+    "total_days": 0,
+}
+
+# Compare-and-set attempts when sessions finish concurrently.
+UPDATE_ATTEMPTS = 3
+
+
+def user_query(user_id):
+    """
+    Sessions store user_id as an ObjectId string, or a username for
+    older accounts.
+    """
+
+    user_id = str(user_id)
+
+    if ObjectId.is_valid(user_id):
+        return {"_id": ObjectId(user_id)}
+
+    return {"username": user_id}
+
+
+def qualifies(session):
+
+    return session.get("completion_status") in STREAK_STATUSES
+
+
+def _previous_day(day):
+
+    return (datetime.strptime(day, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def advance_streak(state, day):
+    """
+    Streak state after studying on day (YYYY-MM-DD). Days already
+    counted, or earlier than last_day, leave the state unchanged;
+    record_study_day counts an earlier day towards total_days.
+    """
+
+    state = {**EMPTY_STREAK, **(state or {})}
+
+    last_day = state["last_day"]
+
+    if last_day is not None and day <= last_day:
+        return state
+
+    current = state["current"] + 1 if last_day == _previous_day(day) else 1
+
+    return {
+        "current": current,
+        "longest": max(state["longest"], current),
+        "last_day": day,
+        "total_days": state["total_days"] + 1,
+    }
+
+
+def first_session_of_day(user_id, day, db):
+    """
+    Whether the qualifying session just saved for day is the only one.
+    """
+
+    count = db.sessions.count_documents(
+        {
+            "user_id": str(user_id),
+            "date": day,
+            "completion_status": {"$in": list(STREAK_STATUSES)}
+        },
+        limit=2
+    )
+
+    return count <= 1
+
+
+def record_earlier_day(user_id, day, state, db):
+    """
+    A session saved for a day before last_day. current and longest only
+    follow the newest day, so a gap it fills is left to the backfill;
+    total_days counts it when it is a new study day.
+    """
+
+    if not first_session_of_day(user_id, day, db):
+        return {**EMPTY_STREAK, **state}
+
+    user = db.users.find_one_and_update(
+        user_query(user_id),
+        {"$inc": {"streak.total_days": 1}},
+        projection={"streak": 1},
+        return_document=ReturnDocument.AFTER
+    )
+
+    return {**EMPTY_STREAK, **user["streak"]} if user else None
+
+
+def record_study_day(user_id, day, db=None):
+    """
+    Advance the user's streak for a study day. Call it after the
+    session is saved. Returns the new state, or None when the user does
+    not exist.
+    """
+
+    db = db if db is not None else get_db()
+
+    query = user_query(user_id)
+
+    for _ in range(UPDATE_ATTEMPTS):
+
+        user = db.users.find_one(query, {"streak": 1})
+
+        if not user:
+            return None
+
+        state = user.get("streak")
+
+        if state and state.get("last_day") and day < state["last_day"]:
+            return record_earlier_day(user_id, day, state, db)
+        updated = advance_streak(state, day)
+
+        if state is not None and updated == {**EMPTY_STREAK, **state}:
+            return updated
+
+        # Only one concurrent writer can move last_day forward.
+        guard = {"streak.last_day": state["last_day"]} if state else {"streak": {"$exists": False}}
+
+        result = db.users.update_one(
+            {**query, **guard},
+            {"$set": {"streak": updated}}
+        )
+
+        if result.modified_count:
+            return updated
+
+    return None
+
+
+def streak_view(state, today=None):
+    """
+    Stored state as of today: current drops to 0 once a day is missed.
+    """
+
+    state = {**EMPTY_STREAK, **(state or {})}
+
+    today = today or datetime.now(IST).strftime("%Y-%m-%d")
+
+    alive = state["last_day"] in (today, _previous_day(today))
+
+    return {
+        **state,
+        "current": state["current"] if alive else 0,
+        "studied_today": state["last_day"] == today,
+    }
+
+
+def get_streak(user_id, db=None):
+    """
+    The user's streak with a single field fetch, or None when the user
+    does not exist.
+    """
+
+    db = db if db is not None else get_db()
+
+    user = db.users.find_one(user_query(user_id), {"streak": 1})
+
+    if not user:
+        return None
+
+    return streak_view(user.get("streak"))
+
+
+def rebuild_streak(user_id, db=None):
+    """
+    Recompute a user's streak from raw sessions.
+    """
+
+    db = db if db is not None else get_db()
+
+    days = db.sessions.distinct(
+        "date",
+        {
+            "user_id": str(user_id),
+            "completion_status": {"$in": list(STREAK_STATUSES)}
+        }
+    )
+
+    state = dict(EMPTY_STREAK)
+
+    for day in sorted(day for day in days if day):
+        state = advance_streak(state, day)
+
+    db.users.update_one(user_query(user_id), {"$set": {"streak": state}})
+
+    return state
+
+
+@click.group("streaks")
+def streaks_cli():
+    """Manage study streaks."""
+
+
+@streaks_cli.command("backfill")
+@click.option("--user-id", default=None, help="Rebuild one user only.")
+def backfill_command(user_id):
+    """Rebuild streak state from the sessions collection."""
+
+    db = get_db()
+
+    user_ids = [user_id] if user_id else db.sessions.distinct("user_id")
+
+    for each in user_ids:
+        rebuild_streak(each, db)
+
+    click.echo(f"{len(user_ids)} streaks rebuilt")
@@ -2,6 +2,21 @@ from planora_app.extensions import get_db
 from datetime import datetime, timedelta
 from bson import ObjectId
 import pytz
+from planora_app.indexes import register_index, register_hot_query
+from planora_app.pomodoro.rollup_services import record_session, sum_rollups, rollup_totals
+from planora_app.pomodoro.streak_services import qualifies, record_study_day
+
+
+register_index("sessions", [("user_id", 1), ("created_at", -1)])
+register_index("sessions", [("user_id", 1), ("date", 1)])
+register_index("sessions", [("user_id", 1), ("start_time", -1)])
+
+register_hot_query(
+    "recent sessions", "sessions",
+    {"user_id": "user"},
+    [("created_at", -1)]
+)
+
 
 class TimerService:
     """Service class for timer-related database operations"""
@@ -78,6 +93,19 @@ class TimerService:
             # Insert into sessions collection
             result = db.sessions.insert_one(session_doc)
             
+            # Add to the day's rollup; the backfill repairs a missed one
+            try:
+                record_session(session_doc)
+            except Exception as e:
+                print(f"Error updating daily rollup: {e}")
+            
+            # Advance the study streak on a qualifying session
+            if qualifies(session_doc):
+                try:
+                    record_study_day(user_id, session_doc['date'], db)
+                except Exception as e:
+                    print(f"Error updating streak: {e}")
+            
             # Update user statistics in users collection
             TimerService._update_user_stats(
                 user_id,
@@ -183,41 +211,26 @@ class TimerService:
     def get_session_stats(user_id, days=7):
         """Get session statistics for a user over a period"""
         try:
-            db = get_db()
             user_id = str(user_id)
             ist = pytz.timezone('Asia/Kolkata')
             
-            # Calculate date range in IST
-            end_date_ist = datetime.now(ist)
-            start_date_ist = end_date_ist - timedelta(days=days)
+            # Sum the daily rollups from the first day of the period (IST)
+            start_date = (datetime.now(ist) - timedelta(days=days)).strftime("%Y-%m-%d")
             
-            # Aggregate statistics from sessions collection
-            pipeline = [
-                {
-                    "$match": {
-                        "user_id": user_id,
-                        "created_at": {"$gte": start_date_ist, "$lte": end_date_ist}
-                    }
-                },
-                {
-                    "$group": {
-                        "_id": None,
-                        "total_sessions": {"$sum": 1},
-                        "total_time": {"$sum": "$total_time"},
-                        "total_cycles": {"$sum": "$no_of_cycles_completed"},
-                        "completed_sessions": {
-                            "$sum": {"$cond": [{"$eq": ["$completion_status", "Completed"]}, 1, 0]}
-                        },
-                        "total_pauses": {"$sum": "$pause_count"}
-                    }
-                }
-            ]
+            totals = rollup_totals(user_id, start_date)
             
-            result = list(db.sessions.aggregate(pipeline))
+            result = []
+            if totals['sessions']:
+                result.append({
+                    "total_sessions": totals['sessions'],
+                    "total_time": totals['minutes'],
+                    "total_cycles": totals['cycles'],
+                    "completed_sessions": totals['completed_sessions'],
+                    "total_pauses": totals['pauses']
+                })
             
             if result:
                 stats = result[0]
-                stats.pop('_id', None)
                 
                 # Add additional computed metrics
                 if stats['total_sessions'] > 0:
@@ -261,35 +274,22 @@ class TimerService:
     def get_subject_breakdown(user_id, days=7):
         """Get study time breakdown by subject"""
         try:
-            db = get_db()
             user_id = str(user_id)
             ist = pytz.timezone('Asia/Kolkata')
             
-            # Calculate date range in IST
-            end_date_ist = datetime.now(ist)
-            start_date_ist = end_date_ist - timedelta(days=days)
+            # Sum the daily rollups from the first day of the period (IST)
+            start_date = (datetime.now(ist) - timedelta(days=days)).strftime("%Y-%m-%d")
             
-            pipeline = [
+            results = [
                 {
-                    "$match": {
-                        "user_id": user_id,
-                        "created_at": {"$gte": start_date_ist, "$lte": end_date_ist}
-                    }
-                },
-                {
-                    "$group": {
-                        "_id": "$subject",
-                        "total_time": {"$sum": "$total_time"},
-                        "session_count": {"$sum": 1},
-                        "cycles_completed": {"$sum": "$no_of_cycles_completed"}
-                    }
-                },
-                {
-                    "$sort": {"total_time": -1}
+                    "_id": item['_id'],
+                    "total_time": item['minutes'],
+                    "session_count": item['sessions'],
+                    "cycles_completed": item['cycles']
                 }
+                for item in sum_rollups(user_id, start_date, group_by="subject")
             ]
-            
-            results = list(db.sessions.aggregate(pipeline))
+            results.sort(key=lambda item: item['total_time'], reverse=True)
             
             # Format results
             breakdown = []
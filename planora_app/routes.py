@@ -1,4 +1,6 @@
-from flask import Blueprint, redirect, session, url_for
+from flask import Blueprint, jsonify, redirect, session, url_for
+
+from planora_app.extensions import get_pool_stats
 
 main_bp = Blueprint('main', __name__)
 
@@ -7,3 +9,18 @@ def index():
     if 'user_id' in session:
         return redirect(url_for('dashboard.dashboard'))
     return redirect(url_for('auth.login'))
+
+
+@main_bp.route("/status/db")
+def db_status():
+    """
+    Mongo pool metrics for this worker process. Checkout waits that
+    climb toward the server selection timeout mean the pool is too
+    small; connections_open times the worker count must stay under the
+    cluster's connection limit. Only for logged-in users.
+    """
+
+    if 'user_id' not in session:
+        return jsonify({"error": "User not logged in"}), 401
+
+    return jsonify({"mongo": get_pool_stats()})
@@ -1,87 +1,33 @@
 import os
-from datetime import datetime, timedelta
 import bcrypt
 import re
-import pytz
 from bson import ObjectId
 from werkzeug.utils import secure_filename
+from planora_app.pomodoro.rollup_services import rollup_totals
+from planora_app.pomodoro.streak_services import get_streak, streak_view
 
 def calculate_study_stats(db, user_id):
     """
-    Calculates the streak and progress statistics for the user based on real sessions.
+    Calculates the streak and progress statistics for the user.
     - Current Streak: consecutive study days ending today (or yesterday).
     - Longest Streak: highest streak of consecutive study days ever achieved.
     - Total Study Days: count of unique study days.
     - Total Study Hours: sum of completed study time in hours.
+    Streaks come from the state kept on the user document; hours from
+    the daily session rollups.
     """
     user_id = str(user_id)
     
-    # Query sessions where completion_status is Completed (case-insensitive)
-    sessions = list(db.sessions.find({
-        "user_id": user_id,
-        "completion_status": {"$in": ["Completed", "completed"]}
-    }))
-    
-    # Build unique set of studied dates
-    studied_days = set()
-    total_minutes = 0
-    
-    for s in sessions:
-        date_str = s.get("date")
-        if date_str:
-            try:
-                studied_days.add(datetime.strptime(date_str, "%Y-%m-%d").date())
-            except ValueError:
-                pass
-        total_minutes += s.get("total_time", 0)
-        
-    # Total Study Days is the number of unique dates
-    total_study_days = len(studied_days)
+    streak = get_streak(user_id, db) or streak_view(None)
     
     # Total Study Hours is the sum of completed study time divided by 60
-    total_study_hours = round(total_minutes / 60.0, 1)
-    
-    # Current Streak Calculation (IST timezone context)
-    ist = pytz.timezone('Asia/Kolkata')
-    today = datetime.now(ist).date()
-    
-    current_streak = 0
-    if today in studied_days:
-        day_check = today
-        while day_check in studied_days:
-            current_streak += 1
-            day_check -= timedelta(days=1)
-    elif (today - timedelta(days=1)) in studied_days:
-        day_check = today - timedelta(days=1)
-        while day_check in studied_days:
-            current_streak += 1
-            day_check -= timedelta(days=1)
-    else:
-        current_streak = 0
-        
-    # Longest Streak Calculation
-    sorted_days = sorted(list(studied_days))
-    longest_streak = 0
-    current_run = 0
-    prev_day = None
-    
-    for day in sorted_days:
-        if prev_day is None:
-            current_run = 1
-        elif day == prev_day + timedelta(days=1):
-            current_run += 1
-        elif day == prev_day:
-            pass
-        else:
-            longest_streak = max(longest_streak, current_run)
-            current_run = 1
-        prev_day = day
-    longest_streak = max(longest_streak, current_run)
+    totals = rollup_totals(user_id, only="completed_sessions", db=db)
+    total_study_hours = round(totals["completed_minutes"] / 60.0, 1)
     
     return {
-        "current_streak": current_streak,
-        "longest_streak": longest_streak,
-        "total_study_days": total_study_days,
+        "current_streak": streak["current"],
+        "longest_streak": streak["longest"],
+        "total_study_days": streak["total_days"],
         "total_study_hours": total_study_hours
     }
 
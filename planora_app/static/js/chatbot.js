@@ -641,7 +641,7 @@ async function sendMessage() {
   try {
     const documentId = await uploadPendingSources();
     const response = await fetch(
-      "/chatbot/send",
+      "/chatbot/send-stream",
 
       {
         method: "POST",
@@ -658,29 +658,61 @@ async function sendMessage() {
       },
     );
 
-    const data = await response.json();
-
     if (!response.ok) {
+      const data = await response.json();
+
       throw new Error(data.content || data.error || "Request failed");
     }
 
-    if (loadingElement) {
-      loadingElement.remove();
-    }
+    let streamedText = "";
 
-    if (data.type === "flashcards") {
-      appendToolCard(
-        "flashcards",
+    let streamElement = null;
 
-        data.content.title,
+    await readEventStream(response, (event, data) => {
+      if (loadingElement) {
+        loadingElement.remove();
+      }
 
-        `${data.content.card_count} flashcards generated`,
+      if (event === "chunk") {
+        streamedText += data.content;
 
-        data.content.id,
-      );
-    } else {
-      appendAssistantMessage(data.content || data.reply);
-    }
+        if (!streamElement) {
+          streamElement = appendAssistantMessage(streamedText);
+        } else {
+          streamElement.innerHTML = marked.parse(streamedText);
+        }
+
+        scrollChatToBottom();
+
+        return;
+      }
+
+      if (data.type === "flashcards") {
+        appendToolCard(
+          "flashcards",
+
+          data.content.title,
+
+          `${data.content.card_count} flashcards generated`,
+
+          data.content.id,
+        );
+      } else if (data.type === "mindmap") {
+        appendToolCard(
+          "mindmap",
+
+          data.content.title,
+
+          "Mindmap generated",
+
+          data.content.id,
+        );
+      } else if (streamElement) {
+        streamElement.innerHTML = marked.parse(data.content);
+      } else {
+        appendAssistantMessage(data.content || data.reply);
+      }
+    });
 
     await loadConversations();
 
@@ -693,6 +725,54 @@ async function sendMessage() {
   }
 }
 
+/* ==========================================================
+                SERVER-SENT EVENTS
+========================================================== */
+
+async function readEventStream(response, onEvent) {
+  const reader = response.body.getReader();
+
+  const decoder = new TextDecoder();
+
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+
+    if (done) {
+      break;
+    }
+
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary = buffer.indexOf("\n\n");
+
+    while (boundary !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+
+      buffer = buffer.slice(boundary + 2);
+
+      let event = "message";
+
+      let data = "";
+
+      for (const line of rawEvent.split("\n")) {
+        if (line.startsWith("event: ")) {
+          event = line.slice(7);
+        } else if (line.startsWith("data: ")) {
+          data += line.slice(6);
+        }
+      }
+
+      if (data) {
+        onEvent(event, JSON.parse(data));
+      }
+
+      boundary = buffer.indexOf("\n\n");
+    }
+  }
+}
+
 /* ==========================================================
                 USER MESSAGE
 ========================================================== */
@@ -1014,15 +1094,18 @@ async function generateFlashcards() {
           conversation_id: currentConversationId,
           document_id: documentId,
           card_count: 10,
+          background: true,
         }),
       },
     );
 
     const data = await response.json();
 
+    const flashcardSet = data.success ? await waitForJob(data.job_id) : null;
+
     loading.remove();
 
-    if (!data.success) {
+    if (!flashcardSet) {
       appendAssistantMessage("⚠️ Unable to generate flashcards.");
 
       return;
@@ -1031,11 +1114,11 @@ async function generateFlashcards() {
     appendToolCard(
       "flashcards",
 
-      data.flashcard_set.title,
+      flashcardSet.title,
 
-      `${data.flashcard_set.card_count} flashcards generated`,
+      `${flashcardSet.card_count} flashcards generated`,
 
-      data.flashcard_set.id,
+      flashcardSet.id,
     );
 
     scrollChatToBottom();
@@ -1110,24 +1193,27 @@ async function generateMindmap() {
         body: JSON.stringify({
           conversation_id: currentConversationId,
           document_id: source.documentId,
+          background: true,
         }),
       },
     );
 
     const data = await response.json();
 
+    const mindmap = data.success ? await waitForJob(data.job_id) : null;
+
     loading.remove();
 
-    if (!data.success) {
+    if (!mindmap) {
       appendAssistantMessage("⚠️ Unable to generate mindmap.");
       return;
     }
 
     appendToolCard(
       "mindmap",
-      data.mindmap.title,
+      mindmap.title,
       "Mindmap generated",
-      data.mindmap.id,
+      mindmap.id,
     );
 
     scrollChatToBottom();
@@ -1143,6 +1229,32 @@ async function generateMindmap() {
   }
 }
 
+/* ==========================================================
+                BACKGROUND JOBS
+========================================================== */
+
+async function waitForJob(jobId, intervalMs = 1500) {
+  while (true) {
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+
+    const response = await fetch(`/jobs/${jobId}`);
+
+    if (!response.ok) {
+      return null;
+    }
+
+    const job = await response.json();
+
+    if (job.status === "done") {
+      return job.result;
+    }
+
+    if (job.status === "failed") {
+      return null;
+    }
+  }
+}
+
 // PART 5
 
 /* ==========================================================
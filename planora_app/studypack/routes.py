@@ -0,0 +1,95 @@
+from flask import Blueprint, request, jsonify
+from planora_app.studypack.services import (
+    generate_study_pack,
+    get_document_summary
+)
+from planora_app.chatbot.services import save_study_pack_messages
+from planora_app.jobs.routes import submit_job_response
+
+studypack_bp = Blueprint(
+    "studypack",
+    __name__,
+    url_prefix="/studypack"
+)
+
+
+@studypack_bp.route("/generate", methods=["POST"])
+def generate():
+
+    data = request.get_json()
+
+    document_id = data.get("document_id")
+    card_count = data.get("card_count", 10)
+    conversation_id = data.get("conversation_id")
+
+    if not document_id:
+
+        return jsonify({
+
+            "error": "Document missing"
+
+        }), 400
+
+    if data.get("background"):
+
+        return submit_job_response("studypack", {
+
+            "document_id": document_id,
+
+            "card_count": card_count,
+
+            "conversation_id": conversation_id
+
+        })
+
+    try:
+
+        pack = generate_study_pack(
+
+            document_id,
+
+            card_count
+
+        )
+
+    except Exception:
+
+        pack = None
+
+    if pack is None:
+
+        return jsonify({
+
+            "success": False,
+
+            "error": "Unable to generate study pack."
+
+        })
+
+    if conversation_id:
+
+        save_study_pack_messages(conversation_id, pack)
+
+    return jsonify({
+
+        "success": True,
+
+        "study_pack": pack
+
+    })
+
+
+@studypack_bp.route("/summary/<document_id>")
+def summary(document_id):
+
+    summary = get_document_summary(document_id)
+
+    if summary is None:
+
+        return jsonify({
+
+            "error": "Summary not found"
+
+        }), 404
+
+    return jsonify(summary)
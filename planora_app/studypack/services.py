@@ -0,0 +1,200 @@
+"""
+One-call study pack generation.
+
+Handles:
+- a single Gemini request for flashcards, a mindmap and a summary
+- splitting the sectioned response into its parts
+- storing them in the flashcards, mindmaps and summaries collections
+
+Compared with generating flashcards and a mindmap separately, the PDF
+is read and the study material sent upstream once instead of twice.
+"""
+
+import re
+from datetime import datetime, UTC
+
+from bson import ObjectId
+
+from planora_app.extensions import get_db
+from planora_app.ai.pdf_utils import get_pdf_text, pdf_path_for
+from planora_app.ai.chunking import chunk_text, CHUNK_SIZE
+from planora_app.ai.gemini import MODEL_NAME, generate_response
+from planora_app.ai.packing import pack_document_prompt
+from planora_app.ai.utils import strip_code_fences
+from planora_app.flashcards.services import (
+    FLASHCARD_FORMAT,
+    parse_flashcards,
+    save_flashcard_set
+)
+from planora_app.mindmap.services import MINDMAP_RULES, save_mindmap
+from planora_app.indexes import register_index
+
+
+# Same material the flashcard generator reads; the mindmap used two chunks.
+STUDY_PACK_CHUNKS = 3
+
+register_index("summaries", [("document_id", 1), ("created_at", -1)])
+
+SECTION_PATTERN = re.compile(
+    r"^=+\s*(SUMMARY|FLASHCARDS|MINDMAP)\s*=+\s*$",
+    re.MULTILINE
+)
+
+
+def _study_pack_instructions(card_count):
+
+    return f"""
+You are an expert study assistant.
+
+From the study material below, produce three sections, each starting
+with its marker line exactly as shown, and nothing else:
+
+===SUMMARY===
+A concise summary of the material in 5 to 8 sentences of plain text.
+
+===FLASHCARDS===
+Exactly {card_count} study flashcards as valid JSON in this format:{FLASHCARD_FORMAT}
+
+===MINDMAP===
+ONE study mindmap in Mermaid mindmap syntax, without markdown fences.
+
+{MINDMAP_RULES}
+Study Material:
+
+"""
+
+
+def split_sections(response):
+    """
+    Split a sectioned response into {"SUMMARY": ..., ...}. Missing
+    sections are absent from the result.
+    """
+
+    parts = {}
+
+    matches = list(SECTION_PATTERN.finditer(response))
+
+    for position, match in enumerate(matches):
+
+        end = (
+            matches[position + 1].start()
+            if position + 1 < len(matches)
+            else len(response)
+        )
+
+        parts[match.group(1)] = response[match.end():end].strip()
+
+    return parts
+
+
+def generate_study_pack(document_id, card_count=10):
+    """
+    Generate and store flashcards, a mindmap and a summary for a
+    document with one Gemini call. Returns the stored parts, or None
+    when nothing usable came back. A part that fails to parse is
+    returned as None while the others are still stored.
+    """
+
+    if not document_id or not ObjectId.is_valid(document_id):
+        return None
+
+    db = get_db()
+
+    document = db.chat_documents.find_one({
+        "_id": ObjectId(document_id)
+    })
+
+    if not document:
+        return None
+
+    pdf_path = pdf_path_for(document["stored_filename"])
+
+    text, _ = get_pdf_text(
+        pdf_path,
+        document.get("content_hash"),
+        max_chars=STUDY_PACK_CHUNKS * CHUNK_SIZE
+    )
+
+    chunks = chunk_text(text)[:STUDY_PACK_CHUNKS]
+
+    packed = pack_document_prompt(
+        _study_pack_instructions(card_count),
+        chunks,
+        MODEL_NAME
+    )
+
+    response = generate_response(
+        packed.text,
+        user_id=document.get("user_id")
+    )
+
+    sections = split_sections(response)
+
+    pack = {
+        "flashcards": None,
+        "mindmap": None,
+        "summary": None
+    }
+
+    try:
+        cards = parse_flashcards(sections.get("FLASHCARDS", ""))
+    except ValueError:
+        cards = []
+
+    if cards:
+        pack["flashcards"] = save_flashcard_set(document, cards)
+
+    mindmap = strip_code_fences(sections.get("MINDMAP", ""), "mermaid")
+
+    if mindmap:
+        pack["mindmap"] = save_mindmap(document, mindmap)
+
+    summary = sections.get("SUMMARY", "")
+
+    if summary:
+        pack["summary"] = save_summary(document, summary)
+
+    if not any(pack.values()):
+        return None
+
+    return pack
+
+
+def save_summary(document, summary):
+
+    db = get_db()
+
+    title = document["original_filename"].replace(".pdf", "")
+
+    result = db.summaries.insert_one({
+        "document_id": str(document["_id"]),
+        "title": title,
+        "summary": summary,
+        "created_at": datetime.now(UTC)
+    })
+
+    return {
+        "id": str(result.inserted_id),
+        "title": title,
+        "summary": summary
+    }
+
+
+def get_document_summary(document_id):
+    """
+    Latest stored summary for a document, or None.
+    """
+
+    db = get_db()
+
+    summary = db.summaries.find_one(
+        {"document_id": document_id},
+        sort=[("created_at", -1)]
+    )
+
+    if not summary:
+        return None
+
+    summary["_id"] = str(summary["_id"])
+
+    return summary
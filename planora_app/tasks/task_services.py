@@ -3,6 +3,17 @@ from bson.objectid import ObjectId
 from datetime import datetime
 from typing import Optional
 
+from planora_app.indexes import register_index, register_hot_query
+
+
+register_index("tasks", [("user_id", 1), ("completed", 1), ("deadline", 1)])
+
+register_hot_query(
+    "open tasks", "tasks",
+    {"user_id": "user", "completed": False}
+)
+
+
 def _serialize_task(doc: dict) -> dict:
     """Convert Mongo task document to JSON-serializable dict."""
     if not doc:
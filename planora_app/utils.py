@@ -1,36 +1,134 @@
 # planora_app/utils.py
-from datetime import datetime, timezone
+import threading
+from datetime import datetime, timedelta, timezone
+
 from bson import ObjectId
+from pymongo import ReturnDocument
+
 from planora_app.extensions import get_db
 
+
+# Quota for users created before daily_quota was stored on signup.
+DEFAULT_DAILY_QUOTA = 10000
+
+# Users Mongo has denied, per process, until the next UTC midnight
+# reset. Mongo decides everything else.
+_exhausted_until = {}
+_exhausted_lock = threading.Lock()
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+def _next_utc_midnight(now):
+    return datetime(now.year, now.month, now.day, tzinfo=timezone.utc) + timedelta(days=1)
+
+
+def _known_exhausted(user_key, tokens_needed):
+    """
+    Return True when Mongo already denied this user a request at most
+    this large since the last daily reset, without a database round
+    trip.
+    """
+    with _exhausted_lock:
+        exhausted = _exhausted_until.get(user_key)
+
+        if exhausted is None:
+            return False
+
+        until, smallest_denied = exhausted
+
+        if datetime.now(timezone.utc) >= until:
+            del _exhausted_until[user_key]
+            return False
+
+        return tokens_needed >= smallest_denied
+
+
+def _mark_exhausted(user_key, tokens_needed, now_utc):
+    """
+    Remember a denial until the next daily reset. Any request at least
+    as large as the smallest denied one cannot fit either.
+    """
+    with _exhausted_lock:
+        _, smallest_denied = _exhausted_until.get(user_key, (None, tokens_needed))
+        _exhausted_until[user_key] = (
+            _next_utc_midnight(now_utc),
+            min(smallest_denied, tokens_needed)
+        )
+
+
 def check_and_update_quota(user_id: str, tokens_needed: int) -> bool:
-    db = get_db()
+    """
+    Atomically reset the daily counter if needed and charge tokens_needed.
+
+    One conditional find_one_and_update: the filter only matches when the
+    (possibly reset) usage plus tokens_needed fits the quota, and the
+    pipeline update applies the reset and the increment together, so
+    concurrent requests cannot overspend.
+    """
+    user_key = str(user_id)
+
+    if _known_exhausted(user_key, tokens_needed):
+        print(f"❌ Quota exceeded (local): user={user_key}, needed={tokens_needed}")
+        return False
 
     if not isinstance(user_id, ObjectId):
+        if not ObjectId.is_valid(user_id):
+            print("❌ User not found:", user_id)
+            return False
         user_id = ObjectId(user_id)
 
-    user = db.users.find_one({"_id": user_id})
-    if not user:
-        print("❌ User not found:", user_id)
-        return False
+    db = get_db()
 
     now_utc = datetime.now(timezone.utc)
-    last_reset = user.get("quota_last_reset")
+    today_start = datetime(now_utc.year, now_utc.month, now_utc.day, tzinfo=timezone.utc)
 
-    if not last_reset or now_utc.date() > last_reset.date():
-        db.users.update_one(
-            {"_id": user_id},
-            {"$set": {"tokens_used": 0, "quota_last_reset": now_utc}}
-        )
-        user["tokens_used"] = 0
+    needs_reset = {
+        "$lt": [
+            {"$ifNull": ["$quota_last_reset", datetime.min]},
+            today_start
+        ]
+    }
 
-    if user.get("tokens_used", 0) + tokens_needed > user.get("daily_quota", 0):
-        print(f"❌ Quota exceeded: used={user.get('tokens_used', 0)}, "
-              f"needed={tokens_needed}, quota={user.get('daily_quota', 0)}")
-        return False
+    used_today = {
+        "$cond": [needs_reset, 0, {"$ifNull": ["$tokens_used", 0]}]
+    }
 
-    db.users.update_one(
-        {"_id": user_id},
-        {"$inc": {"tokens_used": tokens_needed}}
+    user = db.users.find_one_and_update(
+        {
+            "_id": user_id,
+            "$expr": {
+                "$lte": [
+                    {"$add": [used_today, tokens_needed]},
+                    {"$ifNull": ["$daily_quota", DEFAULT_DAILY_QUOTA]}
+                ]
+            }
+        },
+        [
+            {"$set": {
+                "tokens_used": {"$add": [used_today, tokens_needed]},
+                "quota_last_reset": {
+                    "$cond": [needs_reset, now_utc, "$quota_last_reset"]
+                }
+            }}
+        ],
+        projection={"_id": 1},
+        return_document=ReturnDocument.AFTER
     )
+
+    if user is None:
+        print(f"❌ Quota exceeded or user not found: user={user_key}, needed={tokens_needed}")
+        _mark_exhausted(user_key, tokens_needed, now_utc)
+        return False
+
     return True
+
+
+def enforce_quota(user_id, tokens_needed):
+    """
+    Raise QuotaExceeded unless the user can spend tokens_needed today.
+    """
+    if not check_and_update_quota(user_id, tokens_needed):
+        raise QuotaExceeded()